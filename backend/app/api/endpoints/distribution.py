@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from app.core.database import get_db
+from app.models import DistributionList
+from app.schemas import DistributionListCreate, DistributionListResponse
+
+router = APIRouter()
+
+@router.get("/", response_model=List[DistributionListResponse])
+def read_distribution_lists(db: Session = Depends(get_db)):
+    return db.query(DistributionList).all()
+
+@router.post("/", response_model=DistributionListResponse)
+def create_distribution_list(dist_list: DistributionListCreate, db: Session = Depends(get_db)):
+    if db.query(DistributionList).filter(DistributionList.name == dist_list.name).first():
+        raise HTTPException(status_code=400, detail="A distribution list with this name already exists")
+
+    db_list = DistributionList(**dist_list.model_dump())
+    db.add(db_list)
+    db.commit()
+    db.refresh(db_list)
+    return db_list
+
+@router.put("/{list_id}", response_model=DistributionListResponse)
+def update_distribution_list(list_id: int, dist_list: DistributionListCreate, db: Session = Depends(get_db)):
+    db_list = db.query(DistributionList).filter(DistributionList.id == list_id).first()
+    if not db_list:
+        raise HTTPException(status_code=404, detail="Distribution list not found")
+
+    for key, value in dist_list.model_dump().items():
+        setattr(db_list, key, value)
+    db.commit()
+    db.refresh(db_list)
+    return db_list
+
+@router.delete("/{list_id}")
+def delete_distribution_list(list_id: int, db: Session = Depends(get_db)):
+    db_list = db.query(DistributionList).filter(DistributionList.id == list_id).first()
+    if not db_list:
+        raise HTTPException(status_code=404, detail="Distribution list not found")
+    db.delete(db_list)
+    db.commit()
+    return {"ok": True}
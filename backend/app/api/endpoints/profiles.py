@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from app.core.database import get_db
+from app.models import ResearchProfile, Source
+from app.schemas import ResearchProfileCreate, ResearchProfileResponse
+
+router = APIRouter()
+
+def validate_profile(profile: ResearchProfileCreate, db: Session):
+    if profile.research_breadth is not None and profile.research_breadth < 0:
+        raise HTTPException(status_code=400, detail="research_breadth must not be negative")
+    if profile.research_depth is not None and profile.research_depth < 0:
+        raise HTTPException(status_code=400, detail="research_depth must not be negative")
+    if profile.source_ids:
+        known = {id for (id,) in db.query(Source.id).filter(Source.id.in_(profile.source_ids)).all()}
+        missing = sorted(set(profile.source_ids) - known)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Unknown source ids: {missing}")
+
+@router.get("/", response_model=List[ResearchProfileResponse])
+def read_profiles(db: Session = Depends(get_db)):
+    return db.query(ResearchProfile).all()
+
+@router.post("/", response_model=ResearchProfileResponse)
+def create_profile(profile: ResearchProfileCreate, db: Session = Depends(get_db)):
+    validate_profile(profile, db)
+    if db.query(ResearchProfile).filter(ResearchProfile.name == profile.name).first():
+        raise HTTPException(status_code=400, detail="A profile with this name already exists")
+
+    db_profile = ResearchProfile(**profile.model_dump())
+    db.add(db_profile)
+    db.commit()
+    db.refresh(db_profile)
+    return db_profile
+
+@router.put("/{profile_id}", response_model=ResearchProfileResponse)
+def update_profile(profile_id: int, profile: ResearchProfileCreate, db: Session = Depends(get_db)):
+    db_profile = db.query(ResearchProfile).filter(ResearchProfile.id == profile_id).first()
+    if not db_profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    validate_profile(profile, db)
+
+    for key, value in profile.model_dump().items():
+        setattr(db_profile, key, value)
+    db.commit()
+    db.refresh(db_profile)
+    return db_profile
+
+@router.delete("/{profile_id}")
+def delete_profile(profile_id: int, db: Session = Depends(get_db)):
+    db_profile = db.query(ResearchProfile).filter(ResearchProfile.id == profile_id).first()
+    if not db_profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    db.delete(db_profile)
+    db.commit()
+    return {"ok": True}
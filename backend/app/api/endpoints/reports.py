@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Response
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Response, Query, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app.core.database import get_db
-from app.models import Report
-from app.schemas import ReportResponse
+from app.models import Report, DistributionList, ResearchProfile, ProfilingCapture
+from app.schemas import ReportResponse, DistributeRequest, DeliveryResult, SearchResponse
 from app.services.intelligence import intelligence_service
 from app.services.pdf_service import pdf_service
 from app.services.email_service import email_service
-import re
+from app.services.report_search import report_search
+from app.services.render_service import render_service
+from app.services.export_service import export_service, EXPORT_FORMATS, ZIP_PARTS
+from app.services.settings_service import settings_service
+from app.core.http import cached_json, conditional_response, cache_headers, IMMUTABLE, REVALIDATE
+import hashlib
+import json
+import zlib
 from pydantic import BaseModel
 
 class ShareRequest(BaseModel):
@@ -15,49 +24,145 @@ class ShareRequest(BaseModel):
 
 router = APIRouter()
 
+def report_modified(report: Report) -> datetime:
+    # generated_at is stored without its offset, in the app timezone
+    generated_at = report.generated_at
+    if generated_at.tzinfo is None:
+        generated_at = generated_at.replace(tzinfo=intelligence_service.tz)
+    return generated_at
+
 @router.get("/", response_model=List[ReportResponse])
-def read_reports(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+def read_reports(request: Request, skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
     reports = db.query(Report).order_by(Report.generated_at.desc()).offset(skip).limit(limit).all()
-    return reports
+    # The list changes whenever a report is added or deleted, so it is revalidated
+    return cached_json(request, [ReportResponse.model_validate(r) for r in reports])
+
+@router.get("/search", response_model=SearchResponse)
+def search_reports(
+    q: str = Query(..., min_length=1),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    include_pages: bool = False,
+    skip: int = 0,
+    limit: int = Query(20, le=100)
+):
+    reports = report_search.search_reports(q, date_from, date_to, limit=limit, offset=skip)
+    pages = report_search.search_pages(q, date_from, date_to, limit=limit, offset=skip) if include_pages else []
+    return {"reports": reports, "pages": pages}
+
+@router.get("/export")
+def export_reports(
+    format: str = "ndjson",
+    include: List[str] = Query(default=["md"]),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    after_id: int = 0,
+    profile_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Streams every report in the range, in id order. `after_id` resumes an
+    interrupted export from the last id received (NDJSON line or ZIP folder).
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    stamp = datetime.now().strftime("%Y%m%d")
+    if format == "ndjson":
+        return StreamingResponse(
+            export_service.ndjson(date_from, date_to, after_id, profile_id),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f"attachment; filename=luxprima_reports_{stamp}.ndjson"}
+        )
+
+    parts = [p for p in dict.fromkeys(include) if p]
+    unknown = [p for p in parts if p not in ZIP_PARTS]
+    if unknown or not parts:
+        raise HTTPException(status_code=400, detail=f"include must be some of {', '.join(ZIP_PARTS)}")
+    workers = settings_service.get(db).export_pdf_workers
+    return StreamingResponse(
+        export_service.archive(parts, date_from, date_to, after_id, profile_id, pdf_workers=workers),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=luxprima_reports_{stamp}.zip"}
+    )
+
+@router.get("/captures")
+def read_profiling_captures(skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+    captures = db.query(ProfilingCapture).order_by(ProfilingCapture.id.desc()).offset(skip).limit(limit).all()
+    return [
+        {"id": c.id, "started_at": c.started_at, "report_ids": c.report_ids or [], "summary": c.summary or {}}
+        for c in captures
+    ]
+
+def load_capture(capture_id: int, db: Session) -> dict:
+    capture = db.query(ProfilingCapture).filter(ProfilingCapture.id == capture_id).first()
+    if not capture:
+        raise HTTPException(status_code=404, detail="Profiling capture not found")
+    return json.loads(zlib.decompress(capture.data))
+
+@router.get("/captures/{capture_id}")
+def download_profiling_capture(capture_id: int, db: Session = Depends(get_db)):
+    artifact = load_capture(capture_id, db)
+    return Response(
+        content=json.dumps(artifact, indent=2),
+        media_type="application/json",
+        headers={"Content-Disposition": f"attachment; filename=luxprima_profile_{capture_id}.json",
+                 "Cache-Control": IMMUTABLE}
+    )
+
+@router.get("/captures/{capture_id}/stacks")
+def download_profiling_stacks(capture_id: int, db: Session = Depends(get_db)):
+    """Collapsed stacks for flamegraph.pl or speedscope."""
+    artifact = load_capture(capture_id, db)
+    return Response(
+        content=artifact.get("stacks", ""),
+        media_type="text/plain",
+        headers={"Content-Disposition": f"attachment; filename=luxprima_profile_{capture_id}.folded",
+                 "Cache-Control": IMMUTABLE}
+    )
 
 @router.get("/status")
 def get_service_status():
     return {"status": intelligence_service.current_status}
 
+@router.get("/{report_id}/html", response_class=HTMLResponse)
+def get_report_html(report_id: int, request: Request, db: Session = Depends(get_db)):
+    """Sanitised HTML of the report body, the same markup PDFs and emails use."""
+    report = db.query(Report).filter(Report.id == report_id).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    markdown_content = report.content_markdown or ""
+    etag = '"html-' + render_service.key(markdown_content)[:32] + '"'
+    not_modified = conditional_response(request, etag, IMMUTABLE, report_modified(report))
+    if not_modified is not None:
+        return not_modified
+    return HTMLResponse(render_service.html(markdown_content), headers=cache_headers(etag, IMMUTABLE, report_modified(report)))
+
 @router.get("/{report_id}/pdf")
-async def get_report_pdf(report_id: int, db: Session = Depends(get_db)):
+async def get_report_pdf(report_id: int, request: Request, db: Session = Depends(get_db)):
     report = db.query(Report).filter(Report.id == report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
-    
-    # Simple Metadata Parsing from Logs (Backend version of frontend logic)
-    source_count = 0
-    model_used = "LuxPrima Hybrid"
-    if report.logs:
-        unique_sources = set()
-        for log in report.logs:
-            if "Initializing LLM Provider:" in log:
-                model_used = log.split("Initializing LLM Provider:")[1].strip()
-            url_match = re.search(r"Source: (https?://[^\s]+)", log)
-            if url_match:
-                unique_sources.add(url_match.group(1))
-        source_count = len(unique_sources)
+
+    # Validated before rendering so a cached copy skips PDF generation entirely
+    fingerprint = f"{report.id}|{report.generated_at}|{report.title}|{report.content_markdown or ''}"
+    etag = '"pdf-' + hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:32] + '"'
+    not_modified = conditional_response(request, etag, IMMUTABLE, report_modified(report))
+    if not_modified is not None:
+        return not_modified
 
     pdf_bytes = await pdf_service.generate_pdf(
         title=report.title,
         markdown_content=report.content_markdown or "",
-        metadata={
-            "date": report.generated_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "sources": str(source_count),
-            "model": model_used
-        }
+        metadata=pdf_service.build_metadata(report)
     )
     
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f"attachment; filename=luxprima_briefing_{report_id}.pdf"
+            "Content-Disposition": f"attachment; filename=luxprima_briefing_{report_id}.pdf",
+            **cache_headers(etag, IMMUTABLE, report_modified(report))
         }
     )
 
@@ -78,17 +183,51 @@ async def share_report(report_id: int, request: ShareRequest, db: Session = Depe
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/{report_id}/distribute", response_model=List[DeliveryResult])
+async def distribute_report(report_id: int, request: DistributeRequest, db: Session = Depends(get_db)):
+    report = db.query(Report).filter(Report.id == report_id).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    recipients = list(request.emails)
+    attach_pdf = request.attach_pdf
+    if request.list_id is not None:
+        dist_list = db.query(DistributionList).filter(DistributionList.id == request.list_id).first()
+        if not dist_list:
+            raise HTTPException(status_code=404, detail="Distribution list not found")
+        recipients.extend(dist_list.emails or [])
+        attach_pdf = attach_pdf or dist_list.attach_pdf
+    if not recipients:
+        raise HTTPException(status_code=400, detail="No recipients given")
+
+    try:
+        return await email_service.distribute_report(db, report, recipients, attach_pdf=attach_pdf)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{report_id}", response_model=ReportResponse)
-async def read_report(report_id: int, db: Session = Depends(get_db)):
+async def read_report(report_id: int, request: Request, db: Session = Depends(get_db)):
     report = db.query(Report).filter(Report.id == report_id).first()
     if not report:
         return {"error": "Report not found"}
-    return report
+    # Revalidated: the content is fixed but fields such as profiling_capture_id are set after saving
+    return cached_json(request, ReportResponse.model_validate(report), REVALIDATE, report_modified(report))
 
 @router.post("/generate")
-async def generate_report_endpoint(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    background_tasks.add_task(intelligence_service.generate_daily_report, db)
-    return {"message": "Report generation started in background"}
+async def generate_report_endpoint(background_tasks: BackgroundTasks, profile_ids: List[int] = Query(default=[]),
+                                   profiling: Optional[bool] = None, db: Session = Depends(get_db)):
+    # `profiling` overrides the profiling_enabled setting for this run
+    if not profile_ids:
+        background_tasks.add_task(intelligence_service.generate_daily_report, db, profiling=profiling)
+        return {"message": "Report generation started in background"}
+
+    profiles = db.query(ResearchProfile).filter(ResearchProfile.id.in_(profile_ids)).all()
+    if len(profiles) != len(set(profile_ids)):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    # One crawl feeds every requested profile
+    background_tasks.add_task(intelligence_service.generate_reports, db, [(p, None, None) for p in profiles],
+                              profiling=profiling)
+    return {"message": f"Generation of {len(profiles)} briefing(s) started in background"}
 
 @router.delete("/{report_id}")
 def delete_report(report_id: int, db: Session = Depends(get_db)):
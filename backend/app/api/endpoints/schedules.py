@@ -2,37 +2,85 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
-from app.models import Schedule
+from app.models import Schedule, ResearchProfile
 from app.schemas import ScheduleCreate, ScheduleResponse
 from app.services.scheduler import scheduler_service
 
 router = APIRouter()
 
+def validate_schedule(schedule: ScheduleCreate, db: Session):
+    # Blank strings count as missing; 0 minutes is a given (and invalid) interval
+    schedule.time = (schedule.time or "").strip() or None
+    schedule.cron = (schedule.cron or "").strip() or None
+    kinds = [k for k in (schedule.time, schedule.cron, schedule.interval_minutes) if k is not None]
+    if len(kinds) != 1:
+        raise HTTPException(status_code=400, detail="Provide exactly one of time, cron or interval_minutes")
+
+    if schedule.time:
+        # Validate time format HH:MM
+        try:
+            h, m = map(int, schedule.time.split(":"))
+            if not (0 <= h < 24 and 0 <= m < 60):
+                raise ValueError
+        except:
+            raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM")
+
+    if schedule.cron:
+        from apscheduler.triggers.cron import CronTrigger
+        try:
+            CronTrigger.from_crontab(schedule.cron)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cron expression: {e}")
+
+    if schedule.interval_minutes is not None and schedule.interval_minutes <= 0:
+        raise HTTPException(status_code=400, detail="interval_minutes must be positive")
+    if schedule.max_instances < 1:
+        raise HTTPException(status_code=400, detail="max_instances must be at least 1")
+    if schedule.misfire_grace_time < 0 or (schedule.jitter or 0) < 0:
+        raise HTTPException(status_code=400, detail="misfire_grace_time and jitter must not be negative")
+    for value in (schedule.research_breadth, schedule.research_depth):
+        if value is not None and value < 0:
+            raise HTTPException(status_code=400, detail="Research breadth and depth must not be negative")
+    if schedule.profile_id is not None and not db.query(ResearchProfile).filter(ResearchProfile.id == schedule.profile_id).first():
+        raise HTTPException(status_code=400, detail="Profile not found")
+
 @router.get("/", response_model=List[ScheduleResponse])
 def read_schedules(db: Session = Depends(get_db)):
     return db.query(Schedule).all()
 
 @router.post("/", response_model=ScheduleResponse)
 def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db)):
-    # Validate time format HH:MM
-    try:
-        h, m = map(int, schedule.time.split(":"))
-        if not (0 <= h < 24 and 0 <= m < 60):
-            raise ValueError
-    except:
-        raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM")
-
-    db_schedule = Schedule(time=schedule.time, is_active=schedule.is_active)
+    validate_schedule(schedule, db)
+
+    db_schedule = Schedule(**schedule.model_dump())
     db.add(db_schedule)
     db.commit()
     db.refresh(db_schedule)
     
     # Add to scheduler
     if db_schedule.is_active:
-        scheduler_service.add_job(db_schedule.id, db_schedule.time)
+        scheduler_service.add_job(db_schedule)
         
     return db_schedule
 
+@router.put("/{schedule_id}", response_model=ScheduleResponse)
+def update_schedule(schedule_id: int, schedule: ScheduleCreate, db: Session = Depends(get_db)):
+    db_schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
+    if not db_schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    validate_schedule(schedule, db)
+
+    for key, value in schedule.model_dump().items():
+        setattr(db_schedule, key, value)
+    db.commit()
+    db.refresh(db_schedule)
+
+    if db_schedule.is_active:
+        scheduler_service.add_job(db_schedule)
+    else:
+        scheduler_service.remove_job(schedule_id)
+    return db_schedule
+
 @router.delete("/{schedule_id}")
 def delete_schedule(schedule_id: int, db: Session = Depends(get_db)):
     schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from app.core.database import get_db
-from app.models import Setting
+from app.services.settings_service import settings_service, validate_settings
+from app.core.http import cached_json, PRIVATE_REVALIDATE
 from pydantic import BaseModel
 
 class SettingUpdate(BaseModel):
@@ -12,24 +13,26 @@ class SettingUpdate(BaseModel):
 router = APIRouter()
 
 @router.get("/", response_model=Dict[str, str])
-def read_settings(db: Session = Depends(get_db)):
-    settings = db.query(Setting).all()
-    return {s.key: s.value for s in settings}
+def read_settings(request: Request, db: Session = Depends(get_db)):
+    # Holds credentials: browser cache only, never a shared proxy
+    return cached_json(request, dict(settings_service.get(db).values), PRIVATE_REVALIDATE)
 
 @router.post("/", response_model=Dict[str, str])
 def update_settings(settings_update: List[SettingUpdate], db: Session = Depends(get_db)):
-    for s in settings_update:
-        setting = db.query(Setting).filter(Setting.key == s.key).first()
-        if not setting:
-            setting = Setting(key=s.key, value=s.value)
-            db.add(setting)
-        else:
-            setting.value = s.value
-    db.commit()
+    errors = validate_settings({s.key: s.value for s in settings_update})
+    if errors:
+        raise HTTPException(status_code=400, detail="Invalid settings: " + "; ".join(errors))
+
+    config = settings_service.update(db, [(s.key, s.value) for s in settings_update])
     
     # Return all settings
-    all_settings = db.query(Setting).all()
-    return {s.key: s.value for s in all_settings}
+    return dict(config.values)
+
+@router.get("/llm-stats")
+def get_llm_stats():
+    from app.services.llm_limits import llm_limiters
+    # Counters per provider endpoint: retries, rate limiting, queueing and circuit state
+    return llm_limiters.stats()
 
 @router.get("/local-models")
 def get_local_models(base_url: str):
@@ -49,3 +52,9 @@ def get_local_models(base_url: str):
         print(f"Error fetching models from {base_url}: {str(e)}") # Debug log
         # Fallback or error
         return {"error": str(e), "models": []}
+
+@router.get("/crawl-stats")
+def get_crawl_stats():
+    from app.services.deadlines import host_latency
+    # Learnt latency and page timeout per host
+    return host_latency.snapshot()
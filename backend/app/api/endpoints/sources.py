@@ -1,25 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
 from app.models import Source
 from app.schemas import SourceCreate, SourceResponse
+from app.services.feeds import SOURCE_TYPES
+from app.services.settings_service import settings_service
+from app.services.source_health import source_health, PROBE_TIMEOUT
+from app.services.source_import import parse_import
+from app.core.http import cached_json
 
 router = APIRouter()
 
 @router.get("/", response_model=List[SourceResponse])
-def read_sources(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_sources(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     sources = db.query(Source).offset(skip).limit(limit).all()
-    return sources
+    return cached_json(request, [SourceResponse.model_validate(s) for s in sources])
 
 @router.post("/", response_model=SourceResponse)
 def create_source(source: SourceCreate, db: Session = Depends(get_db)):
+    if source.source_type not in SOURCE_TYPES:
+        raise HTTPException(status_code=400, detail=f"source_type must be one of {', '.join(SOURCE_TYPES)}")
     db_source = Source(url=source.url, name=source.name, source_type=source.source_type, is_active=source.is_active)
     db.add(db_source)
     db.commit()
     db.refresh(db_source)
     return db_source
 
+@router.post("/import")
+async def import_sources(file: UploadFile = File(...), format: Optional[str] = None, probe: bool = True,
+                         activate_unreachable: bool = False, db: Session = Depends(get_db)):
+    """
+    Adds the sources in an OPML, CSV or JSON file, probing new ones
+    concurrently. Unreachable sources are added inactive unless
+    `activate_unreachable`; their health shows why.
+    """
+    try:
+        entries = parse_import(await file.read(), file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    existing = {url for (url,) in db.query(Source.url).filter(Source.url.in_([e["url"] for e in entries])).all()}
+    results, new = [], []
+    for entry in entries:
+        result = {"url": entry["url"], "name": entry["name"], "source_type": entry["source_type"] or "primary",
+                  "id": None, "error": None}
+        if entry["error"]:
+            result.update(status="invalid", error=entry["error"])
+        elif entry["url"] in existing:
+            result["status"] = "exists"
+        else:
+            new.append(result)
+        results.append(result)
+
+    config = settings_service.get(db)
+    probes = await source_health.probe_all(new, timeout=min(PROBE_TIMEOUT, config.page_timeout_seconds)) if probe else [None] * len(new)
+    for result, probed in zip(new, probes):
+        source = Source(url=result["url"], name=result["name"], source_type=result["source_type"], is_active=True)
+        if probed is not None:
+            result.update(source_type=probed["source_type"], latency=probed["latency"],
+                          content_length=probed["content_length"], error=probed["error"])
+            source.source_type = probed["source_type"]
+            source.name = source.name or probed["title"]
+            if probed["ok"]:
+                source_health.record_success(source, probed["latency"], probed["content_length"])
+            else:
+                source_health.record_failure(source, probed["error"], config.source_failure_limit)
+                source.is_active = activate_unreachable
+        db.add(source)
+        db.flush()
+        result.update(id=source.id, status="created" if source.is_active else "inactive")
+    db.commit()
+    return {
+        "created": sum(1 for r in results if r["status"] in ("created", "inactive")),
+        "results": results,
+    }
+
+@router.post("/{source_id}/probe")
+async def probe_source(source_id: int, db: Session = Depends(get_db)):
+    """Checks a source now and records the result; a deactivated source that answers again is reactivated."""
+    source = db.query(Source).filter(Source.id == source_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    config = settings_service.get(db)
+    probed = await source_health.probe(source.url, source.source_type or "primary", min(PROBE_TIMEOUT, config.page_timeout_seconds))
+    if probed["ok"]:
+        # Only undo a deactivation the health tracking made
+        if not source.is_active and config.source_failure_limit and (source.health_failures or 0) >= config.source_failure_limit:
+            source.is_active = True
+        source_health.record_success(source, probed["latency"], probed["content_length"])
+    else:
+        source_health.record_failure(source, probed["error"], config.source_failure_limit)
+    db.commit()
+    db.refresh(source)
+    return {**probed, "source": SourceResponse.model_validate(source)}
+
 @router.delete("/{source_id}")
 def delete_source(source_id: int, db: Session = Depends(get_db)):
     source = db.query(Source).filter(Source.id == source_id).first()
@@ -16,3 +16,4 @@ def get_db():
         yield db
     finally:
         db.close()
+
@@ -0,0 +1,175 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    import brotli
+except ImportError: # Optional; responses fall back to gzip
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Stored for revalidation on every use; `private` keeps shared caches out
+REVALIDATE = "no-cache"
+PRIVATE_REVALIDATE = "private, no-cache"
+
+# Already compressed, or binary where compression gains little
+UNCOMPRESSED_TYPES = ("application/pdf", "application/zip", "application/gzip", "image/", "text/event-stream")
+
+def accepts_encoding(header: str, coding: str) -> bool:
+    """Whether an Accept-Encoding header allows `coding`, honouring q-values (`br;q=0` refuses it)."""
+    wildcard = None
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == coding:
+            return q > 0
+        if name == "*":
+            wildcard = q > 0
+    return bool(wildcard)
+
+class CompressionMiddleware:
+    """
+    Brotli when the client accepts it and the `brotli` package is installed,
+    otherwise Starlette's gzip.
+    """
+
+    def __init__(self, app, minimum_size: int = 1000, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and brotli is not None and accepts_encoding(Headers(scope=scope).get("Accept-Encoding", ""), "br"):
+            await _BrotliResponder(self.app, self.minimum_size, self.brotli_quality)(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
+
+class _BrotliResponder:
+    def __init__(self, app, minimum_size: int, quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self.send = None
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("Content-Type", "")
+            self.passthrough = "Content-Encoding" in headers or any(content_type.startswith(t) for t in UNCOMPRESSED_TYPES)
+            self.start_message = message
+            return
+        if message["type"] == "http.response.body" and self.compressor is not None:
+            await self.send_chunk(message.get("body", b""), message.get("more_body", False))
+            return
+        if message["type"] != "http.response.body" or self.start_message is None:
+            await self.send(message)
+            return
+
+        start, self.start_message = self.start_message, None
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.passthrough or (not more_body and len(body) < self.minimum_size) or start["status"] == 304:
+            await self.send(start)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = "br"
+        headers.add_vary_header("Accept-Encoding")
+        if not more_body:
+            compressed = brotli.compress(body, quality=self.quality)
+            headers["Content-Length"] = str(len(compressed))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+        # Streaming: compress chunk by chunk
+        del headers["Content-Length"]
+        self.compressor = brotli.Compressor(quality=self.quality)
+        await self.send(start)
+        await self.send_chunk(body, more_body)
+
+    async def send_chunk(self, body: bytes, more_body: bool):
+        data = self.compressor.process(body) + (self.compressor.flush() if more_body else self.compressor.finish())
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in tags
+
+def _not_modified_since(header: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not header or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole-second resolution
+    return _utc(last_modified).replace(microsecond=0) <= since
+
+def _utc(value: datetime) -> datetime:
+    # Naive values are taken as UTC; pass aware ones for other zones
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_utc(value), usegmt=True)
+
+def conditional_response(request: Request, etag: str, cache_control: str = REVALIDATE,
+                         last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    The 304 response when the request's validators still match, else None.
+    `etag` is the quoted strong validator of the current representation.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        matched = _etag_matches(if_none_match, etag)
+    else:
+        matched = _not_modified_since(request.headers.get("If-Modified-Since"), last_modified)
+    if not matched:
+        return None
+    return Response(status_code=304, headers=cache_headers(etag, cache_control, last_modified))
+
+def cache_headers(etag: str, cache_control: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+def cached_json(request: Request, content: Any, cache_control: str = REVALIDATE,
+                last_modified: Optional[datetime] = None) -> Response:
+    """
+    JSON response with a strong ETag over its exact bytes, answering 304 when
+    the client already holds them.
+    """
+    body = json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    not_modified = conditional_response(request, etag, cache_control, last_modified)
+    if not_modified is not None:
+        return not_modified
+    return Response(body, media_type="application/json", headers=cache_headers(etag, cache_control, last_modified))
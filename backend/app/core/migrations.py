@@ -0,0 +1,112 @@
+from sqlalchemy import inspect, text
+from app.core.database import Base, engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Schema changes, applied in order and recorded in `schema_version`.
+# Append new migrations; never edit or reorder released ones.
+
+def _create_tables(conn):
+    import app.models  # noqa: F401 - registers every model on Base.metadata
+    Base.metadata.create_all(bind=conn)
+
+def _add_columns(table_name: str, column_names: list):
+    """Adds model columns that an older database is missing (create_all never alters tables)."""
+    def migrate(conn):
+        import app.models  # noqa: F401
+        table = Base.metadata.tables[table_name]
+        inspector = inspect(conn)
+        if not inspector.has_table(table_name):
+            return
+        existing = {c["name"] for c in inspector.get_columns(table_name)}
+        for name in column_names:
+            if name in existing:
+                continue
+            column = table.columns[name]
+            col_type = column.type.compile(dialect=conn.dialect)
+            default = ""
+            if column.default is not None and column.default.is_scalar:
+                value = column.default.arg
+                default = f" DEFAULT {int(value) if isinstance(value, bool) else repr(value)}"
+            conn.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN "{name}" {col_type}{default}'))
+    return migrate
+
+def _autoincrement_reports(conn):
+    """Rebuilds `reports` with AUTOINCREMENT (SQLite can't alter a primary key in place)."""
+    import app.models  # noqa: F401
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type='table' AND name='reports'")).scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return
+    # Renaming moves the indexes and FTS triggers to reports_old; they go with it
+    conn.execute(text("ALTER TABLE reports RENAME TO reports_old"))
+    for (index,) in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='reports_old' AND sql IS NOT NULL"
+    )).all():
+        conn.execute(text(f'DROP INDEX "{index}"'))
+    table = Base.metadata.tables["reports"]
+    table.create(bind=conn)
+    old_columns = {c["name"] for c in inspect(conn).get_columns("reports_old")}
+    columns = ", ".join(f'"{c.name}"' for c in table.columns if c.name in old_columns)
+    conn.execute(text(f"INSERT INTO reports ({columns}) SELECT {columns} FROM reports_old"))
+    conn.execute(text("DROP TABLE reports_old"))
+    _search_index(conn)
+
+def _profile_columns(conn):
+    _add_columns("schedules", ["profile_id"])(conn)
+    _add_columns("reports", ["profile_id"])(conn)
+    _add_columns("distribution_lists", ["profile_ids"])(conn)
+
+def _profiling_captures(conn):
+    _create_tables(conn)
+    _add_columns("reports", ["profiling_capture_id"])(conn)
+
+def _search_index(conn):
+    from sqlalchemy.exc import OperationalError
+    from app.services.report_search import report_search
+    try:
+        report_search.create_schema(conn)
+    except OperationalError as e:
+        # SQLite built without FTS5 fails on the first CREATE VIRTUAL TABLE; search falls back to LIKE
+        logger.warning(f"Skipping full-text search index: {e}")
+
+MIGRATIONS = [
+    (1, "Create tables", _create_tables),
+    (2, "Schedule cron, interval and misfire options", _add_columns("schedules", [
+        "cron", "interval_minutes", "research_breadth", "research_depth",
+        "coalesce", "misfire_grace_time", "max_instances", "jitter",
+    ])),
+    (3, "Report digest", _add_columns("reports", ["digest"])),
+    (4, "Full-text search index", _search_index),
+    (5, "Source feed polling state", _add_columns("sources", [
+        "feed_etag", "feed_last_modified", "feed_watermark", "feed_seen",
+    ])),
+    (6, "Never reuse report ids", _autoincrement_reports),
+    (7, "Research profiles", _create_tables),
+    (8, "Profile columns", _profile_columns),
+    (9, "Profiling captures", _profiling_captures),
+    (10, "Rendered HTML cache", _create_tables),
+    (11, "Source health", _add_columns("sources", [
+        "health_latency", "health_content_length", "health_failures", "health_last_success",
+        "health_last_error", "health_retry_after", "health_checked_at",
+    ])),
+]
+
+def current_version(conn) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, name VARCHAR, applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+def run_migrations(bind=engine) -> int:
+    """Applies pending migrations, each in its own transaction. Returns how many ran."""
+    with bind.begin() as conn:
+        version = current_version(conn)
+    applied = 0
+    for number, name, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with bind.begin() as conn:
+            logger.info(f"Applying migration {number}: {name}")
+            migrate(conn)
+            conn.execute(text("INSERT INTO schema_version (version, name) VALUES (:v, :n)"), {"v": number, "n": name})
+        applied += 1
+    return applied
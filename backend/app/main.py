@@ -1,18 +1,37 @@
 
+import time
+_import_started = time.perf_counter()
+
 from contextlib import asynccontextmanager
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import Base, engine
-from app.api.endpoints import sources, reports, settings, schedules
+from app.core.http import CompressionMiddleware
+from app.core.migrations import run_migrations
+from app.api.endpoints import sources, reports, settings, schedules, distribution, profiles
 from app.services.scheduler import scheduler_service
+from app.services.report_search import report_search
 
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+_import_seconds = time.perf_counter() - _import_started
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    started = time.perf_counter()
+    applied = run_migrations()
+    report_search.detect()
+    migrated = time.perf_counter()
     scheduler_service.start()
     scheduler_service.load_jobs_from_db()
+    app.state.startup_timings = {
+        "imports": round(_import_seconds, 3),
+        "migrations": round(migrated - started, 3),
+        "migrations_applied": applied,
+        "scheduler": round(time.perf_counter() - migrated, 3),
+        "total": round(_import_seconds + time.perf_counter() - started, 3),
+    }
+    logger.info(f"Startup completed in {app.state.startup_timings['total']}s: {app.state.startup_timings}")
     yield
     # Shutdown (scheduler is async, shuts down with event loop usually)
 
@@ -26,11 +45,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Report payloads are mostly markdown and logs, which compress well
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
 
 app.include_router(sources.router, prefix="/api/sources", tags=["sources"])
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 app.include_router(settings.router, prefix="/api/settings", tags=["settings"])
 app.include_router(schedules.router, prefix="/api/schedules", tags=["schedules"])
+app.include_router(distribution.router, prefix="/api/distribution-lists", tags=["distribution"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
 
 @app.get("/")
 @app.get("/api")
@@ -39,6 +62,10 @@ app.include_router(schedules.router, prefix="/api/schedules", tags=["schedules"]
 def read_root():
     return {"status": "ok", "service": "LuxPrima", "service_id": "PLASMA_AI"}
 
+@app.get("/api/startup")
+def read_startup_timings():
+    return getattr(app.state, "startup_timings", {})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
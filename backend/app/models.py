@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Text, JSON, LargeBinary
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -10,10 +10,25 @@ class Source(Base):
     name = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    source_type = Column(String, default="primary") 
+    source_type = Column(String, default="primary") # primary (rendered page), feed (RSS/Atom) or sitemap
+    # Feed and sitemap polling state: conditional GET validators, newest item date and undated item ids seen
+    feed_etag = Column(String, nullable=True)
+    feed_last_modified = Column(String, nullable=True)
+    feed_watermark = Column(DateTime(timezone=True), nullable=True)
+    feed_seen = Column(JSON, nullable=True)
+    # Health, see services/source_health.py
+    health_latency = Column(Float, nullable=True) # Smoothed seconds per fetch
+    health_content_length = Column(Integer, nullable=True) # Characters extracted last time; items for feeds and sitemaps
+    health_failures = Column(Integer, default=0) # Consecutive failures
+    health_last_success = Column(DateTime(timezone=True), nullable=True)
+    health_last_error = Column(String, nullable=True)
+    health_retry_after = Column(DateTime(timezone=True), nullable=True) # Skipped by runs until then
+    health_checked_at = Column(DateTime(timezone=True), nullable=True)
 
 class Report(Base):
     __tablename__ = "reports"
+    # Ids are never reused after a delete, so report URLs can be cached as immutable
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     generated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -21,6 +36,9 @@ class Report(Base):
     content_json = Column(JSON) 
     content_markdown = Column(Text)
     logs = Column(JSON, default=[])
+    digest = Column(JSON, nullable=True) # Compact summary fed to the next run, see services/digest.py
+    profile_id = Column(Integer, nullable=True, index=True) # Research profile; None for the default briefing
+    profiling_capture_id = Column(Integer, nullable=True) # Set when the run was profiled
 
 class Setting(Base):
     __tablename__ = "settings"
@@ -33,6 +51,67 @@ class Schedule(Base):
     __tablename__ = "schedules"
 
     id = Column(Integer, primary_key=True, index=True)
-    time = Column(String) # For simplicity, store as "HH:MM" (24h)
+    time = Column(String, nullable=True) # Daily "HH:MM" (24h), kept for simple schedules
+    cron = Column(String, nullable=True) # Standard 5-field crontab expression
+    interval_minutes = Column(Integer, nullable=True)
+    research_breadth = Column(Integer, nullable=True) # Overrides the global setting when set
+    research_depth = Column(Integer, nullable=True)
+    coalesce = Column(Boolean, default=True) # Collapse a backlog of missed runs into one
+    misfire_grace_time = Column(Integer, default=3600) # Seconds a late run is still allowed to start; 0 means as little as possible (1s)
+    max_instances = Column(Integer, default=1) # Above 1, a run firing during another queues behind it; runs never overlap
+    jitter = Column(Integer, nullable=True) # Random delay in seconds added to each run
+    profile_id = Column(Integer, nullable=True) # Research profile to run; the default briefing when unset
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DistributionList(Base):
+    __tablename__ = "distribution_lists"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    emails = Column(JSON, default=[])
+    attach_pdf = Column(Boolean, default=False)
+    auto_send = Column(Boolean, default=True) # Deliver automatically after scheduled runs
+    profile_ids = Column(JSON, nullable=True) # Auto-send only these profiles' reports; all reports when empty
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ResearchProfile(Base):
+    __tablename__ = "research_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True) # Also the report title, e.g. "Crypto" -> "Crypto Briefing - ..."
+    source_ids = Column(JSON, nullable=True) # Subset of the sources; all active sources when empty
+    synthesis_prompt = Column(Text, nullable=True) # System prompt for synthesis; the trading desk briefing when unset
+    themes = Column(Text, nullable=True) # What passages are ranked against; the default briefing themes when unset
+    research_breadth = Column(Integer, nullable=True) # Overrides the global setting when set
+    research_depth = Column(Integer, nullable=True)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class StoredPage(Base):
+    __tablename__ = "page_store"
+
+    # Content-addressed: sha256 of the uncompressed bytes
+    hash = Column(String, primary_key=True)
+    data = Column(LargeBinary) # zlib compressed
+    size = Column(Integer)
+    last_seen = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class ProfilingCapture(Base):
+    __tablename__ = "profiling_captures"
+
+    id = Column(Integer, primary_key=True, index=True)
+    started_at = Column(DateTime(timezone=True), index=True)
+    report_ids = Column(JSON, default=[])
+    summary = Column(JSON, nullable=True) # Headline numbers, see services/profiling.py
+    data = Column(LargeBinary) # zlib compressed JSON artifact
+
+class RenderedHtml(Base):
+    __tablename__ = "rendered_html"
+
+    # sha256 of renderer version + markdown, see services/render_service.py
+    key = Column(String, primary_key=True)
+    version = Column(String, index=True)
+    html = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -14,6 +14,12 @@ class SourceCreate(SourceBase):
 class SourceResponse(SourceBase):
     id: int
     created_at: datetime
+    health_latency: Optional[float] = None
+    health_content_length: Optional[int] = None
+    health_failures: Optional[int] = 0
+    health_last_success: Optional[datetime] = None
+    health_last_error: Optional[str] = None
+    health_retry_after: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -26,6 +32,8 @@ class ReportResponse(ReportBase):
     generated_at: datetime
     content_markdown: Optional[str] = None
     logs: Optional[List[str]] = []
+    profile_id: Optional[int] = None
+    profiling_capture_id: Optional[int] = None
     # content_json could be added if needed by frontend logic
 
     class Config:
@@ -38,7 +46,16 @@ class LLMConfig(BaseModel):
     base_url: Optional[str] = None
 
 class ScheduleBase(BaseModel):
-    time: str
+    time: Optional[str] = None
+    cron: Optional[str] = None
+    interval_minutes: Optional[int] = None
+    research_breadth: Optional[int] = None
+    research_depth: Optional[int] = None
+    coalesce: bool = True
+    misfire_grace_time: int = 3600
+    max_instances: int = 1
+    jitter: Optional[int] = None
+    profile_id: Optional[int] = None
     is_active: bool = True
 
 class ScheduleCreate(ScheduleBase):
@@ -50,3 +67,69 @@ class ScheduleResponse(ScheduleBase):
 
     class Config:
         from_attributes = True
+
+class DistributionListBase(BaseModel):
+    name: str
+    emails: List[str] = []
+    attach_pdf: bool = False
+    auto_send: bool = True
+    profile_ids: Optional[List[int]] = None
+    is_active: bool = True
+
+class DistributionListCreate(DistributionListBase):
+    pass
+
+class DistributionListResponse(DistributionListBase):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ResearchProfileBase(BaseModel):
+    name: str
+    source_ids: Optional[List[int]] = None
+    synthesis_prompt: Optional[str] = None
+    themes: Optional[str] = None
+    research_breadth: Optional[int] = None
+    research_depth: Optional[int] = None
+    is_active: bool = True
+
+class ResearchProfileCreate(ResearchProfileBase):
+    pass
+
+class ResearchProfileResponse(ResearchProfileBase):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class DistributeRequest(BaseModel):
+    emails: List[str] = []
+    list_id: Optional[int] = None
+    attach_pdf: bool = False
+
+class DeliveryResult(BaseModel):
+    email: str
+    ok: bool
+    attempts: int
+    error: Optional[str] = None
+
+class ReportSearchResult(BaseModel):
+    id: int
+    title: str
+    generated_at: datetime
+    snippet: Optional[str] = None # Escaped HTML, matches wrapped in <mark>
+    rank: float
+
+class PageSearchResult(BaseModel):
+    url: str
+    title: Optional[str] = None
+    crawled_at: Optional[str] = None
+    snippet: Optional[str] = None # Escaped HTML, matches wrapped in <mark>
+    rank: float
+
+class SearchResponse(BaseModel):
+    reports: List[ReportSearchResult] = []
+    pages: List[PageSearchResult] = []
@@ -1,22 +1,47 @@
-from playwright.async_api import async_playwright
-from readability import Document
-from bs4 import BeautifulSoup
 import asyncio
+import time
+from typing import Optional
+import logging
+from app.services.deadlines import host_latency
+from app.services.links import extract_links
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 class CrawlerService:
-    async def crawl(self, url: str):
+    def __init__(self, latency=host_latency):
+        self.latency = latency
+
+    async def crawl(self, url: str, timeout: Optional[float] = None):
+        """
+        `timeout` caps the page load in seconds (e.g. what is left of the run);
+        within it the host's learnt timeout applies.
+        """
+        # Imported lazily: Playwright and the parsers are only needed once a run starts
+        from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+        from readability import Document
+        from bs4 import BeautifulSoup
+
         async with async_playwright() as p:
             # Launch browser (headless by default)
             browser = await p.chromium.launch()
             try:
                 # Create a new page
                 context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                    user_agent=USER_AGENT
                 )
                 page = await context.new_page()
                 
                 # Navigate to the URL
-                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                goto_timeout = self.latency.timeout_for(url, timeout)
+                started = time.monotonic()
+                try:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=goto_timeout * 1000)
+                except PlaywrightTimeoutError:
+                    self.latency.record_timeout(url, goto_timeout)
+                    raise
+                self.latency.record(url, time.monotonic() - started)
                 
                 # Get page content
                 content = await page.content()
@@ -30,15 +55,9 @@ class CrawlerService:
                 soup = BeautifulSoup(summary_html, "lxml")
                 text_content = soup.get_text(separator="\n", strip=True)
                 
-                # Extract all unique absolute links from the page
-                links = await page.evaluate("""
-                    () => {
-                        return Array.from(document.querySelectorAll('a'))
-                            .map(a => a.href)
-                            .filter(href => href.startsWith('http'))
-                    }
-                """)
-                links = list(set(links)) # Unique
+                # Best scored links, with anchor text and whether the article itself cites them
+                # Off the loop: parsing a large page blocks every concurrent crawl
+                links = await asyncio.to_thread(extract_links, content, page.url, summary_html)
                 
                 return {
                     "url": url,
@@ -48,7 +67,7 @@ class CrawlerService:
                     "links": links
                 }
             except Exception as e:
-                print(f"Error crawling {url}: {e}")
+                logger.warning(f"Error crawling {url}: {e}")
                 return {
                     "url": url,
                     "error": str(e),
@@ -58,4 +77,41 @@ class CrawlerService:
             finally:
                 await browser.close()
 
+    async def fetch(self, url: str, timeout: Optional[float] = None):
+        """
+        Plain HTTP GET with the same extraction as `crawl`, for pages that don't
+        need a browser (e.g. articles linked from feeds). Returns the same shape.
+        """
+        import aiohttp
+        from readability import Document
+        from bs4 import BeautifulSoup
+
+        fetch_timeout = self.latency.timeout_for(url, timeout)
+        headers = {"User-Agent": USER_AGENT}
+        started = time.monotonic()
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=fetch_timeout), headers=headers) as session:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    content = await response.text()
+                    final_url = str(response.url)
+            self.latency.record(url, time.monotonic() - started)
+
+            doc = Document(content)
+            summary_html = doc.summary()
+            text_content = BeautifulSoup(summary_html, "lxml").get_text(separator="\n", strip=True)
+            return {
+                "url": url,
+                "title": doc.title(),
+                "content": text_content,
+                "html": summary_html,
+                "links": await asyncio.to_thread(extract_links, content, final_url, summary_html)
+            }
+        except asyncio.TimeoutError:
+            self.latency.record_timeout(url, fetch_timeout)
+            return {"url": url, "error": f"Timed out after {fetch_timeout:.0f}s", "title": "Error", "content": ""}
+        except Exception as e:
+            logger.warning(f"Error fetching {url}: {e}")
+            return {"url": url, "error": str(e), "title": "Error", "content": ""}
+
 crawler_service = CrawlerService()
@@ -0,0 +1,105 @@
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+class RunDeadline:
+    """
+    Wall-clock budget of one report run. `reserve` seconds at the end are kept
+    for synthesis; crawling and expansion only spend what is left before it.
+    A `total` of 0 means no deadline.
+    """
+
+    def __init__(self, total: float, reserve: float = 0.0):
+        self.total = total
+        self.reserve = min(reserve, total) if total else 0.0
+        self.started = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.total > 0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline, or None without one."""
+        if not self.enabled:
+            return None
+        return max(0.0, self.total - self.elapsed())
+
+    def research_left(self) -> Optional[float]:
+        """Seconds left for crawling and expansion before the synthesis reserve."""
+        if not self.enabled:
+            return None
+        return max(0.0, self.total - self.reserve - self.elapsed())
+
+    def stage_end(self, share: float) -> Optional[float]:
+        """
+        Monotonic end time of a stage that may use `share` of the research time
+        left, leaving the rest for later stages. None without a deadline.
+        """
+        left = self.research_left()
+        return None if left is None else time.monotonic() + left * share
+
+    @staticmethod
+    def left(end: Optional[float]) -> Optional[float]:
+        return None if end is None else max(0.0, end - time.monotonic())
+
+    @staticmethod
+    def cap(timeout: Optional[float], limit: Optional[float]) -> Optional[float]:
+        if limit is None:
+            return timeout
+        if timeout is None:
+            return limit
+        return min(timeout, limit)
+
+class HostLatency:
+    """
+    Per-host page load timeouts learnt from observed latency, in the style of
+    TCP's retransmission timer: smoothed mean plus four mean deviations,
+    clamped to [min_timeout, max_timeout]. Unknown hosts get `max_timeout`.
+    """
+
+    def __init__(self, min_timeout: float = 10.0, max_timeout: float = 60.0, alpha: float = 0.125, beta: float = 0.25):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.alpha = alpha
+        self.beta = beta
+        self._hosts: Dict[str, Dict[str, float]] = {}
+
+    def _host(self, url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def timeout_for(self, url: str, max_timeout: Optional[float] = None) -> float:
+        upper = max_timeout or self.max_timeout
+        stats = self._hosts.get(self._host(url))
+        if not stats:
+            return upper
+        return max(min(self.min_timeout, upper), min(upper, stats["mean"] + 4 * stats["dev"]))
+
+    def record(self, url: str, seconds: float):
+        host = self._host(url)
+        stats = self._hosts.get(host)
+        if stats is None:
+            self._hosts[host] = {"mean": seconds, "dev": seconds / 2, "samples": 1, "timeouts": 0}
+            return
+        stats["dev"] = (1 - self.beta) * stats["dev"] + self.beta * abs(seconds - stats["mean"])
+        stats["mean"] = (1 - self.alpha) * stats["mean"] + self.alpha * seconds
+        stats["samples"] += 1
+
+    def record_timeout(self, url: str, timeout: float):
+        # A timeout says the host is at least that slow; back off so the next
+        # attempt gets more room (up to max_timeout) instead of failing again.
+        host = self._host(url)
+        stats = self._hosts.setdefault(host, {"mean": timeout, "dev": timeout / 2, "samples": 0, "timeouts": 0})
+        stats["mean"] = max(stats["mean"], timeout)
+        stats["dev"] = max(stats["dev"], timeout / 2)
+        stats["timeouts"] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            host: {**{k: round(v, 3) for k, v in stats.items()}, "timeout": round(self.timeout_for("//" + host), 1)}
+            for host, stats in self._hosts.items()
+        }
+
+host_latency = HostLatency()
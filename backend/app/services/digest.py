@@ -0,0 +1,93 @@
+import re
+from collections import Counter
+from typing import List
+
+HEADING_RE = re.compile(r"^#{2,4}\s+(.+?)\s*$", re.MULTILINE)
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+SECTION_HEADINGS = {
+    "executive summary", "market overview", "key developments", "ongoing situations",
+    "market sentiment & emerging trends", "market sentiment and emerging trends",
+}
+
+def _clean(value: str) -> str:
+    return re.sub(r"[*_`#]+", "", value).strip(" :.-|")
+
+def _sentiment_rows(markdown_text: str) -> List[dict]:
+    rows = []
+    header = None
+    for line in markdown_text.splitlines():
+        line = line.strip()
+        if not (line.startswith("|") and line.endswith("|")):
+            header = None
+            continue
+        cells = [_clean(c) for c in line.strip("|").split("|")]
+        if header is None:
+            lowered = [c.lower() for c in cells]
+            if any("sentiment" in c for c in lowered):
+                header = lowered
+            continue
+        if all(set(c) <= set("-: ") for c in cells):
+            continue
+        row = dict(zip(header, cells))
+        theme = next((v for k, v in row.items() if "theme" in k or "index" in k), cells[0])
+        rows.append({
+            "theme": theme,
+            "sentiment": next((v for k, v in row.items() if "sentiment" in k), ""),
+            "strength": next((v for k, v in row.items() if "strength" in k), ""),
+        })
+    return rows
+
+def build_digest(markdown_text: str, max_entities: int = 15, max_themes: int = 12) -> dict:
+    """Extracts a compact, structured summary of a briefing from its markdown."""
+    themes = []
+    for heading in HEADING_RE.findall(markdown_text or ""):
+        heading = _clean(re.sub(r"^\d+\.\s*", "", heading))
+        if heading and heading.lower() not in SECTION_HEADINGS and heading not in themes:
+            themes.append(heading)
+
+    entities = Counter()
+    # Table cells are covered by the sentiment rows
+    prose = "\n".join(l for l in (markdown_text or "").splitlines() if not l.strip().startswith("|"))
+    for match in BOLD_RE.findall(prose):
+        entity = _clean(match)
+        if entity and len(entity) <= 60 and entity.lower() not in SECTION_HEADINGS:
+            entities[entity] += 1
+
+    sentiment = _sentiment_rows(markdown_text or "")
+    sentiment_themes = {row["theme"].lower() for row in sentiment}
+    return {
+        "themes": themes[:max_themes],
+        "entities": [e for e, _ in entities.most_common() if e.lower() not in sentiment_themes][:max_entities],
+        "sentiment": sentiment,
+    }
+
+def format_digests(reports: List, max_chars: int) -> str:
+    """
+    Renders the digests of previous reports (newest first) for the synthesis
+    prompt. Stops adding detail once `max_chars` is reached.
+    """
+    blocks = []
+    used = 0
+    for report in reports:
+        digest = report.digest or {}
+        lines = [f"[{report.generated_at.strftime('%Y-%m-%d %H:%M')}] {report.title}"]
+        if digest.get("sentiment"):
+            lines.append("Sentiment: " + "; ".join(
+                f"{r['theme']} {r['sentiment']}" + (f" ({r['strength']})" if r.get("strength") else "")
+                for r in digest["sentiment"]
+            ))
+        if digest.get("themes"):
+            lines.append("Stories: " + "; ".join(digest["themes"]))
+        if digest.get("entities"):
+            lines.append("Entities: " + ", ".join(digest["entities"]))
+        block = "\n".join(lines)
+        if used + len(block) > max_chars:
+            # Keep whatever fits of the remaining budget, cut at a line boundary
+            remaining = max_chars - used
+            block = block[:remaining].rsplit("\n", 1)[0] if remaining > 0 else ""
+            if block:
+                blocks.append(block)
+            break
+        blocks.append(block)
+        used += len(block) + 2
+    return "\n\n".join(blocks)
@@ -1,33 +1,32 @@
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.mime.application import MIMEApplication
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from app.models import Setting
-import markdown
+from app.services.settings_service import settings_service, AppConfig
+from app.services.render_service import render_service
 import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SMTPConfigError(Exception):
+    """Configuration or authentication problem that no retry can fix."""
+    pass
 
 class EmailService:
-    def get_smtp_config(self, db: Session):
-        settings = db.query(Setting).filter(Setting.key.in_([
-            "smtp_host", "smtp_port", "smtp_user", "smtp_pass", "smtp_sender", "smtp_stream"
-        ])).all()
-        return {s.key: s.value for s in settings}
+    max_attempts = 3
+    retry_delay = 2.0
 
-    def _sync_send(self, config, to_email, report_title, markdown_content):
-        host = config.get("smtp_host")
-        port = int(config.get("smtp_port", 587))
-        user = config.get("smtp_user")
-        password = config.get("smtp_pass")
-        sender = config.get("smtp_sender", user)
-        stream_id = config.get("smtp_stream")
+    def get_smtp_config(self, db: Session) -> AppConfig:
+        return settings_service.get(db)
 
-        if not all([host, user, password]):
-            raise Exception("SMTP configuration is incomplete. Please check Settings.")
+    def render_html(self, report_title: str, markdown_content: str) -> str:
+        html_body = render_service.html(markdown_content)
 
-        # Convert Markdown to HTML
-        html_body = markdown.markdown(markdown_content, extensions=['tables', 'fenced_code'])
-        
-        full_html = f"""
+        return f"""
         <html>
         <head>
             <style>
@@ -44,36 +43,178 @@ class EmailService:
         </html>
         """
 
+    def _build_message(self, sender, stream_id, to_email, report_title, full_html, pdf_bytes=None, pdf_name=None):
         msg = MIMEMultipart()
         msg['From'] = sender
         msg['To'] = to_email
         msg['Subject'] = f"LuxPrima Briefing: {report_title}"
-        
+
         if stream_id:
             msg['X-Message-Stream'] = stream_id
 
         msg.attach(MIMEText(full_html, 'html'))
 
+        if pdf_bytes:
+            attachment = MIMEApplication(pdf_bytes, _subtype="pdf")
+            attachment.add_header("Content-Disposition", "attachment", filename=pdf_name or "luxprima_briefing.pdf")
+            msg.attach(attachment)
+        return msg
+
+    def _connect(self, config: AppConfig):
+        host = config.smtp_host
+        port = config.smtp_port
+        user = config.smtp_user
+        password = config.smtp_pass
+
+        if not all([host, user, password]):
+            raise SMTPConfigError("SMTP configuration is incomplete. Please check Settings.")
+
+        # Use SMTP_SSL for port 465, otherwise use SMTP + starttls
+        if port == 465:
+            server = smtplib.SMTP_SSL(host, port, timeout=10)
+        else:
+            server = smtplib.SMTP(host, port, timeout=10)
         try:
-            # Use SMTP_SSL for port 465, otherwise use SMTP + starttls
-            if port == 465:
-                server = smtplib.SMTP_SSL(host, port, timeout=10)
-            else:
-                server = smtplib.SMTP(host, port, timeout=10)
+            if port != 465:
                 server.starttls()
-            
-            with server:
-                server.login(user, password)
-                server.send_message(msg)
-            return True
+            server.login(user, password)
+            return server
         except smtplib.SMTPAuthenticationError:
-            raise Exception("SMTP Authentication failed. Check username/password.")
-        except Exception as e:
-            raise Exception(f"SMTP Error: {str(e)}")
+            server.close()
+            raise SMTPConfigError("SMTP Authentication failed. Check username/password.")
+        except Exception:
+            # Don't leak the socket when the handshake fails
+            server.close()
+            raise
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def _sync_send_batch(self, config: AppConfig, recipients: List[str], report_title: str, full_html: str,
+                         pdf_bytes: Optional[bytes] = None, pdf_name: Optional[str] = None):
+        """Sends one message per recipient over a single authenticated connection."""
+        sender = config.smtp_sender or config.smtp_user
+        stream_id = config.smtp_stream
+
+        results = []
+        server = None
+        # Consecutive failed connects, across recipients; at max_attempts the server is taken to be down
+        connect_failures = 0
+        try:
+            for to_email in recipients:
+                if connect_failures >= self.max_attempts:
+                    results.append({"email": to_email, "ok": False, "attempts": 0,
+                                    "error": f"Not attempted, SMTP server unreachable: {last_error}"})
+                    continue
+                msg = self._build_message(sender, stream_id, to_email, report_title, full_html, pdf_bytes, pdf_name)
+                result = {"email": to_email, "ok": False, "attempts": 0, "error": None}
+                while result["attempts"] < self.max_attempts:
+                    result["attempts"] += 1
+                    try:
+                        if server is None:
+                            try:
+                                server = self._connect(config)
+                            except SMTPConfigError:
+                                raise
+                            except Exception:
+                                connect_failures += 1
+                                raise
+                            connect_failures = 0
+                        server.send_message(msg)
+                        result["ok"] = True
+                        result["error"] = None
+                        break
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Permanent for this address, retrying will not help
+                        result["error"] = f"Recipient refused: {e.recipients}"
+                        break
+                    except SMTPConfigError:
+                        raise
+                    except smtplib.SMTPResponseException as e:
+                        reply = e.smtp_error.decode(errors="replace") if isinstance(e.smtp_error, bytes) else e.smtp_error
+                        result["error"] = f"SMTP Error: {e.smtp_code} {reply}"
+                        if e.smtp_code >= 500:
+                            # Permanent rejection (e.g. sender refused, message too large); smtplib has
+                            # already reset the transaction, so the connection stays usable
+                            break
+                        if server is not None:
+                            self._close(server)
+                            server = None
+                    except Exception as e:
+                        # Drop the connection and reconnect on the next attempt
+                        result["error"] = f"SMTP Error: {str(e)}"
+                        if server is not None:
+                            self._close(server)
+                            server = None
+                    if connect_failures >= self.max_attempts:
+                        break
+                    if result["attempts"] < self.max_attempts:
+                        time.sleep(self.retry_delay * result["attempts"])
+                if not result["ok"]:
+                    last_error = result["error"]
+                    logger.warning(f"Delivery to {to_email} failed: {result['error']}")
+                results.append(result)
+        finally:
+            if server is not None:
+                self._close(server)
+        return results
+
+    def _sync_send(self, config, to_email, report_title, markdown_content):
+        results = self._sync_send_batch(config, [to_email], report_title, self.render_html(report_title, markdown_content))
+        if not results[0]["ok"]:
+            raise Exception(results[0]["error"])
+        return True
 
     async def send_report_email(self, db: Session, to_email: str, report_title: str, markdown_content: str):
         config = self.get_smtp_config(db)
         # Run synchronous blocking code in a thread pool to avoid hanging the event loop
         return await asyncio.to_thread(self._sync_send, config, to_email, report_title, markdown_content)
 
+    async def _render_payload(self, report, attach_pdf: bool):
+        full_html = self.render_html(report.title, report.content_markdown or "")
+        pdf_bytes = None
+        if attach_pdf:
+            from app.services.pdf_service import pdf_service
+            pdf_bytes = await pdf_service.generate_pdf(
+                title=report.title,
+                markdown_content=report.content_markdown or "",
+                metadata=pdf_service.build_metadata(report)
+            )
+        return full_html, pdf_bytes
+
+    async def distribute_report(self, db: Session, report, recipients: List[str], attach_pdf: bool = False):
+        """Renders the report once and delivers it to every recipient, returning per-recipient results."""
+        recipients = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+        if not recipients:
+            return []
+
+        config = self.get_smtp_config(db)
+        full_html, pdf_bytes = await self._render_payload(report, attach_pdf)
+        return await asyncio.to_thread(
+            self._sync_send_batch, config, recipients, report.title, full_html,
+            pdf_bytes, f"luxprima_briefing_{report.id}.pdf"
+        )
+
+    async def deliver_to_lists(self, db: Session, report, lists):
+        """Sends a report to each distribution list, sharing one HTML and PDF render between them."""
+        config = self.get_smtp_config(db)
+        full_html, pdf_bytes = await self._render_payload(report, any(l.attach_pdf for l in lists))
+
+        delivery = {}
+        for dist_list in lists:
+            recipients = list(dict.fromkeys(e.strip() for e in dist_list.emails or [] if e and e.strip()))
+            if not recipients:
+                continue
+            try:
+                delivery[dist_list.name] = await asyncio.to_thread(
+                    self._sync_send_batch, config, recipients, report.title, full_html,
+                    pdf_bytes if dist_list.attach_pdf else None, f"luxprima_briefing_{report.id}.pdf"
+                )
+            except Exception as e:
+                delivery[dist_list.name] = [{"email": r, "ok": False, "attempts": 0, "error": str(e)} for r in recipients]
+        return delivery
+
 email_service = EmailService()
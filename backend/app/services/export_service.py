@@ -0,0 +1,180 @@
+import asyncio
+import json
+import re
+import zipfile
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models import Report
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "zip")
+ZIP_PARTS = ("md", "html", "pdf")
+# Reports read from the database per query; only one batch is held at a time
+BATCH_SIZE = 50
+# Bytes buffered before a chunk of the archive is handed to the response
+CHUNK_SIZE = 64 * 1024
+
+def _slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (title or "").lower()).strip("-")[:60] or "report"
+
+def report_record(report: Report) -> dict:
+    return jsonable_encoder({
+        "id": report.id,
+        "title": report.title,
+        "generated_at": report.generated_at,
+        "profile_id": report.profile_id,
+        "content_markdown": report.content_markdown,
+        "digest": report.digest,
+        "logs": report.logs,
+    })
+
+class _ChunkWriter:
+    """
+    Write-only sink for zipfile. Having no seek/tell makes zipfile stream its
+    entries with data descriptors instead of rewriting local headers.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self.chunks, self.size = b"".join(self.chunks), [], 0
+        return data
+
+class ExportService:
+    """
+    Streams reports over a date range as NDJSON or a ZIP archive in constant
+    memory. Reports are exported in id order, so the last exported id is a
+    cursor: passing it back as `after_id` resumes an interrupted export.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def iter_reports(self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                     after_id: int = 0, profile_id: Optional[int] = None) -> Iterator[Report]:
+        # Keyset pagination with a short-lived session per batch: no long read
+        # transaction, and nothing accumulates in an identity map
+        while True:
+            db: Session = self.session_factory()
+            try:
+                query = db.query(Report).filter(Report.id > after_id)
+                if date_from:
+                    query = query.filter(Report.generated_at >= date_from)
+                if date_to:
+                    query = query.filter(Report.generated_at <= date_to)
+                if profile_id is not None:
+                    query = query.filter(Report.profile_id == profile_id)
+                batch = query.order_by(Report.id).limit(BATCH_SIZE).all()
+                db.expunge_all()
+            finally:
+                db.close()
+            yield from batch
+            if len(batch) < BATCH_SIZE:
+                return
+            after_id = batch[-1].id
+
+    async def ndjson(self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                     after_id: int = 0, profile_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        One report per line, then a trailer line {"export": {...}} marking the
+        export complete. A stream cut short has no trailer; resume from the
+        last id received.
+        """
+        count, cursor = 0, after_id
+        for report in self.iter_reports(date_from, date_to, after_id, profile_id):
+            yield (json.dumps(report_record(report), ensure_ascii=False) + "\n").encode("utf-8")
+            count, cursor = count + 1, report.id
+            await asyncio.sleep(0) # Let other requests run between lines
+        yield (json.dumps({"export": {"complete": True, "count": count, "cursor": cursor}}) + "\n").encode("utf-8")
+
+    async def archive(self, parts: List[str], date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                      after_id: int = 0, profile_id: Optional[int] = None, pdf_workers: int = 3) -> AsyncIterator[bytes]:
+        """
+        ZIP with a `<id>-<slug>/` folder per report holding the requested parts
+        and a closing `manifest.json` with the cursor. PDFs are rendered
+        `pdf_workers` at a time, a bounded window ahead of the report being
+        written, so archive order stays by id.
+        """
+        from app.services.pdf_service import pdf_service
+        sink = _ChunkWriter()
+        archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+        reports = self.iter_reports(date_from, date_to, after_id, profile_id)
+        count, cursor, failed = 0, after_id, []
+
+        async def entries(render=None) -> AsyncIterator[tuple]:
+            if render is None:
+                for report in reports:
+                    yield report, None
+                return
+            window: deque = deque()
+            try:
+                for report in reports:
+                    task = asyncio.ensure_future(render(report.title, report.content_markdown or "",
+                                                        pdf_service.build_metadata(report)))
+                    window.append((report, task))
+                    if len(window) >= pdf_workers * 2:
+                        report, task = window.popleft()
+                        yield report, await asyncio.gather(task, return_exceptions=True)
+                while window:
+                    report, task = window.popleft()
+                    yield report, await asyncio.gather(task, return_exceptions=True)
+            finally:
+                # Client went away: don't leave renders running
+                for _, task in window:
+                    task.cancel()
+
+        async def write_all(render=None) -> AsyncIterator[bytes]:
+            nonlocal count, cursor
+            async for report, rendered in entries(render):
+                folder = f"{report.id}-{_slug(report.title)}/"
+                metadata = pdf_service.build_metadata(report)
+                if "md" in parts:
+                    archive.writestr(folder + "report.md", report.content_markdown or "")
+                if "html" in parts:
+                    html = pdf_service.render_html(report.title, report.content_markdown or "", metadata)
+                    archive.writestr(folder + "report.html", html)
+                if rendered is not None:
+                    pdf = rendered[0]
+                    if isinstance(pdf, Exception):
+                        logger.warning(f"Export: PDF of report {report.id} failed: {pdf}")
+                        failed.append(report.id)
+                        archive.writestr(folder + "pdf-error.txt", str(pdf))
+                    else:
+                        # Already compressed
+                        archive.writestr(folder + "report.pdf", pdf, compress_type=zipfile.ZIP_STORED)
+                count, cursor = count + 1, report.id
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.take()
+                await asyncio.sleep(0)
+
+        if "pdf" in parts:
+            async with pdf_service.renderer(pdf_workers) as render:
+                async for chunk in write_all(render):
+                    yield chunk
+        else:
+            async for chunk in write_all():
+                yield chunk
+
+        archive.writestr("manifest.json", json.dumps({
+            "complete": True, "count": count, "cursor": cursor, "parts": parts, "pdf_failed": failed,
+        }, indent=2))
+        archive.close()
+        yield sink.take()
+
+export_service = ExportService()
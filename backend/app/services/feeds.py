@@ -0,0 +1,230 @@
+import gzip
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+from urllib.parse import urljoin
+import logging
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TYPES = ("primary", "feed", "sitemap")
+# Undated items are recognised by id; remember this many per source
+SEEN_ITEMS_LIMIT = 500
+# Child sitemaps of a sitemap index followed per poll, newest first
+MAX_CHILD_SITEMAPS = 3
+# Item content at least this long is taken as the full article
+FULL_TEXT_CHARS = 1500
+MAX_DOCUMENT_BYTES = 20 * 1024 * 1024
+USER_AGENT = "Mozilla/5.0 (compatible; LuxPrima feed reader)"
+
+def _local(tag: str) -> str:
+    # Drop the XML namespace: "{http://www.w3.org/2005/Atom}entry" -> "entry"
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def _children(element, name: str):
+    return [child for child in element if _local(child.tag) == name]
+
+def _text(element, *names: str) -> str:
+    for name in names:
+        for child in _children(element, name):
+            if child.text and child.text.strip():
+                return child.text.strip()
+    return ""
+
+def parse_date(value: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value) # RSS (RFC 822)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00")) # Atom, sitemaps (W3C)
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def _item(url: str, title: str = "", published: str = "", content: str = "", item_id: str = "") -> dict:
+    return {"id": item_id or url, "url": url, "title": title, "published": parse_date(published), "content": content}
+
+def parse_document(body: bytes, base_url: str) -> dict:
+    """
+    Parses an RSS 2.0 / RSS 1.0 / Atom feed, a sitemap or a sitemap index.
+    Returns {"kind": "feed" | "sitemap" | "sitemapindex", "items": [...]}.
+    """
+    if body[:2] == b"\x1f\x8b": # sitemap.xml.gz served without Content-Encoding
+        body = gzip.decompress(body)
+    root = ET.fromstring(body)
+    kind = _local(root.tag)
+    items = []
+
+    if kind == "urlset":
+        for url in _children(root, "url"):
+            loc = _text(url, "loc")
+            if not loc:
+                continue
+            # Google News sitemaps carry a title and publication date per URL
+            news = next(iter(_children(url, "news")), None)
+            title = _text(news, "title") if news is not None else ""
+            published = (_text(news, "publication_date") if news is not None else "") or _text(url, "lastmod")
+            items.append(_item(urljoin(base_url, loc), title, published))
+        return {"kind": "sitemap", "items": items}
+
+    if kind == "sitemapindex":
+        for sitemap in _children(root, "sitemap"):
+            loc = _text(sitemap, "loc")
+            if loc:
+                items.append(_item(urljoin(base_url, loc), published=_text(sitemap, "lastmod")))
+        return {"kind": "sitemapindex", "items": items}
+
+    if kind == "feed": # Atom
+        for entry in _children(root, "entry"):
+            link = ""
+            for candidate in _children(entry, "link"):
+                if candidate.get("rel", "alternate") == "alternate" and candidate.get("href"):
+                    link = candidate.get("href")
+                    break
+            if not link:
+                continue
+            items.append(_item(
+                urljoin(base_url, link), _text(entry, "title"), _text(entry, "published", "updated"),
+                _text(entry, "content", "summary"), _text(entry, "id"),
+            ))
+        return {"kind": "feed", "items": items}
+
+    # RSS 2.0 items live in <channel>, RSS 1.0 (RDF) items next to it
+    channel = next(iter(_children(root, "channel")), root)
+    for entry in _children(channel, "item") + (_children(root, "item") if channel is not root else []):
+        link = _text(entry, "link")
+        guid = _text(entry, "guid")
+        if not link and guid.startswith("http"):
+            link = guid
+        if not link:
+            continue
+        items.append(_item(
+            urljoin(base_url, link), _text(entry, "title"), _text(entry, "pubDate", "date", "published"),
+            _text(entry, "encoded", "description"), guid,
+        ))
+    return {"kind": "feed", "items": items}
+
+def item_page(item: dict) -> Optional[dict]:
+    """
+    A crawl result built from the item's own content when the feed carries
+    the full article, so the page needn't be fetched. None for summaries.
+    """
+    if not item["content"]:
+        return None
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(item["content"], "lxml")
+    text_content = soup.get_text(separator="\n", strip=True)
+    if len(text_content) < FULL_TEXT_CHARS:
+        return None
+    from app.services.links import extract_links
+    return {
+        "url": item["url"],
+        "title": item["title"],
+        "content": text_content,
+        "html": item["content"],
+        # The item content is the article body, so all of its links count as cited
+        "links": extract_links(item["content"], item["url"], item["content"])
+    }
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands DateTime columns back naive
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def select_new(items: List[dict], watermark: Optional[datetime], seen: List[str], limit: int) -> List[dict]:
+    """
+    Items newer than the watermark (dated) or not seen before (undated),
+    newest first, at most `limit`.
+    """
+    watermark = _as_utc(watermark)
+    seen_ids = set(seen)
+    new = []
+    for item in items:
+        if item["published"] is not None and watermark is not None:
+            if item["published"] > watermark:
+                new.append(item)
+        elif item["id"] not in seen_ids:
+            new.append(item)
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    new.sort(key=lambda i: i["published"] or oldest, reverse=True)
+    return list({i["url"]: i for i in new}.values())[:limit]
+
+class FeedService:
+    """
+    Polls feed and sitemap sources with conditional GET and works out which
+    items are new since the last run, so only those are fetched.
+    """
+
+    async def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                    timeout: Optional[float] = None) -> dict:
+        import aiohttp
+        headers = {"User-Agent": USER_AGENT, "Accept": "application/rss+xml, application/atom+xml, application/xml, text/xml;q=0.9, */*;q=0.8"}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout or 60)) as session:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return {"status": 304, "body": b"", "etag": etag, "last_modified": last_modified}
+                response.raise_for_status()
+                body = await response.content.read(MAX_DOCUMENT_BYTES)
+                return {
+                    "status": response.status,
+                    "body": body,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+
+    async def poll(self, source, limit: int, timeout: Optional[float] = None) -> dict:
+        """
+        Returns {"not_modified", "items", "state"}: the new items (capped at
+        `limit`) and the source's feed state to store once they are processed.
+        """
+        state = {
+            "feed_etag": source.feed_etag,
+            "feed_last_modified": source.feed_last_modified,
+            "feed_watermark": _as_utc(source.feed_watermark),
+            "feed_seen": list(source.feed_seen or []),
+        }
+        response = await self.fetch(source.url, state["feed_etag"], state["feed_last_modified"], timeout)
+        if response["status"] == 304:
+            return {"not_modified": True, "items": [], "state": state}
+
+        document = parse_document(response["body"], source.url)
+        items = document["items"]
+        if document["kind"] == "sitemapindex":
+            items = await self._expand_index(items, state["feed_watermark"], timeout)
+
+        new = select_new(items, state["feed_watermark"], state["feed_seen"], limit)
+        # Items beyond the cap count as seen too, so a long feed doesn't turn into a backlog
+        dates = [i["published"] for i in items if i["published"] is not None]
+        if dates:
+            # Stored as UTC: SQLite drops the offset
+            state["feed_watermark"] = max(dates + ([state["feed_watermark"]] if state["feed_watermark"] else [])).astimezone(timezone.utc)
+        undated = [i["id"] for i in items if i["published"] is None]
+        state["feed_seen"] = list(dict.fromkeys(undated + state["feed_seen"]))[:SEEN_ITEMS_LIMIT]
+        state["feed_etag"] = response["etag"]
+        state["feed_last_modified"] = response["last_modified"]
+        return {"not_modified": False, "items": new, "state": state}
+
+    async def _expand_index(self, sitemaps: List[dict], watermark: Optional[datetime], timeout: Optional[float]) -> List[dict]:
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        sitemaps = [s for s in sitemaps if s["published"] is None or watermark is None or s["published"] > watermark]
+        sitemaps.sort(key=lambda s: s["published"] or oldest, reverse=True)
+        items = []
+        for sitemap in sitemaps[:MAX_CHILD_SITEMAPS]:
+            try:
+                response = await self.fetch(sitemap["url"], timeout=timeout)
+                items += parse_document(response["body"], sitemap["url"])["items"]
+            except Exception as e:
+                logger.warning(f"Failed to read sitemap {sitemap['url']}: {e}")
+        return items
+
+feed_service = FeedService()
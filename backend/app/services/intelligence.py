@@ -1,11 +1,27 @@
-from sqlalchemy.orm import Session
-from app.models import Source, Report, Setting
+from sqlalchemy.orm import Session, load_only
+from app.models import Source, Report, ResearchProfile, ProfilingCapture
 from app.services.crawler import crawler_service
-from app.services.llm import get_llm_service
+from app.services.search import search_service
+from app.services.settings_service import settings_service
+from app.services.page_store import page_store
+from app.services.render_service import render_service
+from app.services.retrieval import build_context
+from app.services.digest import build_digest, format_digests
+from app.services.report_search import report_search
+from app.services.deadlines import RunDeadline
+from app.services.feeds import feed_service, item_page
+from app.services.links import as_link
+from app.services.source_health import source_health
+from app.services.llm import get_llm_service, LLMProvider
+from app.services.profiling import RunProfiler
 from app.core.config import settings
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
 import json
 import logging
 import asyncio
+import time
+import zlib
 from datetime import datetime
 try:
     from zoneinfo import ZoneInfo
@@ -14,23 +30,275 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+EXPANSION_SYSTEM_PROMPT = """You are a research assistant.
+Based on the information gathered so far, identify the next best leads to follow.
+
+Your goal is to find information that adds new dimensions, verifying details, or adds depth to the current data.
+
+Identify:
+1. The most relevant external links for further research from the "Available Links" list (each listed with its anchor text).
+2. Specific search queries to find information on key entities or events mentioned but not linked.
+
+The user message states how many links and search queries to return, followed by the gathered intelligence and the available links.
+
+Return ONLY a JSON object with two keys: "links" (array of URL strings, not objects) and "search_terms" (array of strings).
+Do not include markdown formatting."""
+
+# Share of the research time the primary sources may use when expansion cycles follow
+SOURCES_TIME_SHARE = 0.5
+# Grace on top of a page's timeout for browser start-up and extraction
+CRAWL_GRACE_SECONDS = 15
+# Pages crawled at once when several profiles research concurrently
+MAX_PARALLEL_CRAWLS = 3
+# Fetched pages with less text than this are rendered in the browser instead
+MIN_FETCHED_CHARS = 500
+
+# What the briefing covers; passages are ranked against this plus the previous report's headlines
+BRIEFING_THEMES = """market overview index equities bonds rates yields central bank inflation earnings guidance
+sentiment strength commodities oil gold currencies crypto volatility policy regulation economy growth
+key developments ongoing situations emerging trends early indicators risk outlook"""
+
+SYNTHESIS_SYSTEM_PROMPT = """You are a research assistant generating a Daily Briefing for a trading desk.
+Review the gathered information in the user message and synthesize a comprehensive report.
+The user message starts with the current date and time, then a digest of the previous briefings
+(sentiment, stories and entities), then the input data. Use the digest to describe what changed.
+
+The report MUST be in Markdown format and follow these structural and formatting rules for maximum readability:
+
+1. **Executive Summary**: 
+   - Start with a clear "Market Overview" table.
+   - The table MUST have exactly these three columns: **INDEX / THEME**, **Sentiment**, and **Strength**.
+   - Use short, impactful bullet points below the table.
+   - Limit paragraphs to 3 sentences maximum.
+---
+2. **Key Developments**: 
+   - Break down primary stories into distinct subsections with `###` headers.
+   - Use bolding for key entities and metrics.
+   - Ensure vertical spacing between items.
+---
+3. **Ongoing Situations**: 
+   - Provide concise updates on continuing events.
+   - Highlight any changes since the last report.
+---
+4. **Market Sentiment & Emerging Trends**: 
+   - Analysis of sentiment.
+   - Use the phrase "Early Indicators" to mark emerging trends.
+
+GENERAL FORMATTING RULES:
+- Use horizontal rules (`---`) between the four major sections.
+- Use tables where data can be compared. **IMPORTANT**: Every table row must be on a new line.
+- Use bolding for emphasis, but do not over-bold.
+- Prioritize white space.
+
+Format heavily with bolding, bullet points, and clear headers."""
+
 class IntelligenceService:
     def __init__(self):
         self.current_status = "Idle"
         self.tz = ZoneInfo(settings.APP_TIMEZONE)
+        self.crawler = crawler_service
+        self.search = search_service
+        self.feeds = feed_service
+        self.pages = page_store
+        # Wall time per pipeline stage and page counters of the most recent run
+        self.last_run_stats = {}
+
+    def previous_reports(self, db: Session, limit: int, profile_id: Optional[int] = None) -> list:
+        # Only the small columns; the markdown of old reports is loaded only to backfill a digest
+        reports = db.query(Report).options(
+            load_only(Report.id, Report.title, Report.generated_at, Report.digest)
+        ).filter(
+            Report.profile_id == profile_id if profile_id is not None else Report.profile_id.is_(None)
+        ).order_by(Report.generated_at.desc()).limit(limit).all()
+        backfilled = False
+        for report in reports:
+            # An empty digest is a valid result for an empty report; only missing ones are rebuilt
+            if report.digest is None:
+                report.digest = build_digest(report.content_markdown or "")
+                backfilled = True
+        if backfilled:
+            db.commit()
+        return reports
+
+    def digest_query(self, reports: list) -> str:
+        terms = []
+        for report in reports[:1]:
+            digest = report.digest or {}
+            terms += digest.get("themes", []) + digest.get("entities", [])
+            terms += [row["theme"] for row in digest.get("sentiment", [])]
+        return "\n".join(terms)
+
+    async def generate_daily_report(self, db: Session, llm_provider_name: str = "openai", llm: Optional[LLMProvider] = None,
+                                    research_breadth: Optional[int] = None, research_depth: Optional[int] = None,
+                                    profile: Optional[ResearchProfile] = None, profiling: Optional[bool] = None):
+        results = await self.generate_reports(db, [(profile, research_breadth, research_depth)], llm_provider_name, llm,
+                                              profiling=profiling)
+        if isinstance(results[0], Exception):
+            raise results[0]
+        return results[0]
+
+    async def generate_reports(self, db: Session, targets: List[Tuple[Optional[ResearchProfile], Optional[int], Optional[int]]],
+                               llm_provider_name: str = "openai", llm: Optional[LLMProvider] = None,
+                               profiling: Optional[bool] = None) -> list:
+        """
+        Produces one briefing per target off a single crawl. A target is
+        (profile, breadth override, depth override); a profile of None is the
+        default Daily Briefing over all sources. Sources shared by profiles are
+        crawled once, leads found by several profiles are crawled once, and the
+        profiles' expansion and synthesis run concurrently.
+
+        With `profiling` (default: the `profiling_enabled` setting) the run is
+        profiled and the capture saved and linked from its reports.
+
+        Returns, per target, the saved Report, an {"error": ...} dict or the
+        exception that ended it.
+        """
+        if profiling is None:
+            profiling = settings_service.get(db).profiling_enabled
+        if profiling and RunProfiler.running():
+            # Manual runs don't take the scheduler's run lock, so runs can overlap
+            logger.warning("Another run is being profiled; running this one without profiling")
+            profiling = False
+        if not profiling:
+            return await self._generate_reports(db, targets, llm_provider_name, llm)
+
+        failure = None
+        async with RunProfiler() as profiler:
+            try:
+                results = await self._generate_reports(db, targets, llm_provider_name, llm)
+            except Exception as e:
+                # A crashed run is the one most worth diagnosing
+                failure, results = e, [e]
+        self.save_capture(db, profiler, results)
+        if failure is not None:
+            raise failure
+        return results
 
-    async def generate_daily_report(self, db: Session, llm_provider_name: str = "openai"):
+    def save_capture(self, db: Session, profiler: RunProfiler, results: list):
+        reports = [r for r in results if isinstance(r, Report)]
+        artifact = profiler.artifact(
+            run_stats=self.last_run_stats,
+            report_ids=[r.id for r in reports],
+            errors=[f"{type(r).__name__}: {r}" if isinstance(r, Exception) else r["error"]
+                    for r in results if not isinstance(r, Report)],
+        )
+        try:
+            capture = ProfilingCapture(
+                started_at=profiler.started_at,
+                report_ids=artifact["report_ids"],
+                summary=profiler.summary(),
+                data=zlib.compress(json.dumps(artifact, default=str).encode("utf-8"), 6),
+            )
+            db.add(capture)
+            db.commit()
+            for report in reports:
+                report.profiling_capture_id = capture.id
+            db.commit()
+            logger.info(f"Saved profiling capture {capture.id} ({profiler.samples} samples)")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to save profiling capture: {e}")
+
+    async def _generate_reports(self, db: Session, targets: List[Tuple[Optional[ResearchProfile], Optional[int], Optional[int]]],
+                                llm_provider_name: str = "openai", llm: Optional[LLMProvider] = None) -> list:
         # Initialize execution logs
         execution_logs = []
-        def log(msg: str):
-            logger.info(msg)
-            # Include full date in the first log entry for frontend parsing
-            if not execution_logs:
-                timestamp = datetime.now(self.tz).strftime("%Y-%m-%d %H:%M:%S")
+        run_stats = {"stages": {}, "pages_crawled": 0, "pages_failed": 0, "degraded": []}
+        self.last_run_stats = run_stats
+        run_started = time.perf_counter()
+        crawl_slots = asyncio.Semaphore(MAX_PARALLEL_CRAWLS)
+        crawl_cache = {}
+
+        @contextmanager
+        def stage(name: str):
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                run_stats["stages"][name] = run_stats["stages"].get(name, 0.0) + time.perf_counter() - started
+
+        def page_timeout(stage_end: Optional[float]) -> float:
+            return deadline.cap(config.page_timeout_seconds, deadline.left(stage_end))
+
+        def degrade(msg: str, log_to=None):
+            run_stats["degraded"].append(msg)
+            (log_to or log)(f"Deadline: {msg}")
+
+        async def load(url: str, timeout: float, render: bool) -> dict:
+            if not render:
+                data = await self.crawler.fetch(url, timeout=timeout)
+                if not data.get("error") and len(data.get("content") or "") >= MIN_FETCHED_CHARS:
+                    return data
+                # Blocked or rendered by script: fall back to the browser
+            return await self.crawler.crawl(url, timeout=timeout)
+
+        async def crawl(url: str, timeout: float, render: bool = True):
+            # Backstop in case the crawler overruns its own page timeout
+            limit = timeout * (1 if render else 2) + CRAWL_GRACE_SECONDS
+            async with crawl_slots:
+                try:
+                    data = await asyncio.wait_for(load(url, timeout, render), limit)
+                except asyncio.TimeoutError:
+                    data = {"url": url, "error": f"Timed out after {limit:.0f}s", "title": "Error", "content": ""}
+            return store(data)
+
+        async def crawl_once(url: str, timeout: float):
+            # Profiles researching concurrently often follow the same lead; crawl it once
+            if url not in crawl_cache:
+                crawl_cache[url] = asyncio.ensure_future(crawl(url, timeout))
+            # Shielded so one profile running out of time doesn't cancel the crawl for the others
+            return await asyncio.shield(crawl_cache[url])
+
+        def store(data: dict) -> dict:
+            url = data["url"]
+            if data.get("error"):
+                run_stats["pages_failed"] += 1
             else:
-                timestamp = datetime.now(self.tz).strftime("%H:%M:%S")
-            execution_logs.append(f"[{timestamp}] {msg}")
-        
+                run_stats["pages_crawled"] += 1
+            # Keep only a handle in memory; text is loaded back at synthesis time
+            handle = self.pages.put_page(data)
+            if config.index_page_text and not data.get("error"):
+                try:
+                    report_search.index_page(handle, data.get("content") or "", datetime.now(self.tz))
+                except Exception as e:
+                    logger.warning(f"Indexing {url} for search failed: {e}")
+            return handle
+
+        async def ingest_feed(source: Source, stage_end: Optional[float]) -> list:
+            result = await self.feeds.poll(source, config.feed_max_items, page_timeout(stage_end))
+            if result["not_modified"]:
+                log(f"{source.url}: not modified since last run")
+                return []
+            log(f"{source.url}: {len(result['items'])} new item(s)")
+            pages = []
+            for i, item in enumerate(result["items"]):
+                if deadline.left(stage_end) == 0:
+                    # Keep the old state so the skipped items are picked up next run
+                    degrade(f"skipped {len(result['items']) - i} feed item(s) of {source.url}")
+                    return pages
+                data = await asyncio.to_thread(item_page, item)
+                if data:
+                    pages.append(store(data))
+                else:
+                    crawl_cache[item["url"]] = asyncio.ensure_future(crawl(item["url"], page_timeout(stage_end), render=False))
+                    pages.append(await crawl_cache[item["url"]])
+            # Stored with the reports, so a failed run reads the same items again
+            feed_updates.append((source, result["state"]))
+            return pages
+
+        def make_log(logs: list):
+            def log(msg: str):
+                logger.info(msg)
+                # Include full date in the first log entry for frontend parsing
+                if not logs:
+                    timestamp = datetime.now(self.tz).strftime("%Y-%m-%d %H:%M:%S")
+                else:
+                    timestamp = datetime.now(self.tz).strftime("%H:%M:%S")
+                logs.append(f"[{timestamp}] {msg}")
+            return log
+
+        log = make_log(execution_logs)
+
         def set_status(status: str):
             self.current_status = status
             log(status)
@@ -38,202 +306,303 @@ class IntelligenceService:
         set_status("Initializing Analysis...")
 
         # 1. Fetch Active Sources
-        sources = db.query(Source).filter(Source.is_active == True).all()
-        if not sources:
+        all_sources = db.query(Source).filter(Source.is_active == True).all()
+        if not all_sources:
             log("Error: No active sources found")
             set_status("Idle")
-            return {"error": "No active sources found"}
+            return [{"error": "No active sources found"} for _ in targets]
 
         # 2. Get LLM Service
-        # Try to get config from DB settings first, else defaults
-        settings_keys = ["llm_provider", "llm_api_key", "llm_model", "llm_base_url", "research_breadth", "research_depth"]
-        llm_config = db.query(Setting).filter(Setting.key.in_(settings_keys)).all()
-        config_dict = {s.key: s.value for s in llm_config}
-        
-        provider_name = config_dict.get("llm_provider", llm_provider_name)
-        api_key = config_dict.get("llm_api_key")
-        model = config_dict.get("llm_model")
-        base_url = config_dict.get("llm_base_url")
-        
-        # User defined Breadth and Depth
-        research_breadth = int(config_dict.get("research_breadth", 3))
-        research_depth = int(config_dict.get("research_depth", 1))
+        # Snapshot the settings once so edits made mid-run don't affect this run
+        config = settings_service.get(db)
+
+        provider_name = config.llm_provider or llm_provider_name
+        api_key = config.llm_api_key
+        model = config.llm_model
+        base_url = config.llm_base_url
+
+        plans = []
+        seen_profiles = set()
+        for profile, research_breadth, research_depth in targets:
+            key = profile.id if profile else None
+            if key in seen_profiles:
+                continue
+            seen_profiles.add(key)
+            source_ids = set(profile.source_ids or []) if profile else set()
+            # User defined Breadth and Depth: a schedule overrides the profile, which overrides the global values
+            if research_breadth is None:
+                research_breadth = profile.research_breadth if profile and profile.research_breadth is not None else config.research_breadth
+            if research_depth is None:
+                research_depth = profile.research_depth if profile and profile.research_depth is not None else config.research_depth
+            plans.append({
+                "profile": profile,
+                "name": profile.name if profile else "Daily Briefing",
+                "title": f"{profile.name} Briefing" if profile else "Daily Briefing",
+                "sources": [s for s in all_sources if not source_ids or s.id in source_ids],
+                "breadth": research_breadth,
+                "depth": research_depth,
+                "system_prompt": (profile.synthesis_prompt if profile else None) or SYNTHESIS_SYSTEM_PROMPT,
+                "themes": (profile.themes if profile else None) or BRIEFING_THEMES,
+                "cache_key": f"profile-{profile.id}" if profile else None,
+            })
+        if len(plans) > 1:
+            log(f"Profiles: {', '.join(p['name'] for p in plans)}")
+
+        deadline = RunDeadline(config.run_deadline_seconds, config.synthesis_reserve_seconds)
+        if deadline.enabled:
+            log(f"Deadline: {deadline.total}s ({deadline.reserve}s reserved for synthesis)")
 
         log(f"Initializing LLM Provider: {provider_name} ({model})")
-        log(f"Strategy: Depth {research_depth}, Breadth {research_breadth}")
-        llm = get_llm_service(provider=provider_name, api_key=api_key, model=model, base_url=base_url)
+        for plan in plans:
+            log(f"Strategy{' (' + plan['name'] + ')' if len(plans) > 1 else ''}: Depth {plan['depth']}, Breadth {plan['breadth']}")
+        try:
+            self.pages.prune(config.page_store_retention_days)
+            report_search.prune_pages()
+            render_service.prune(config.page_store_retention_days)
+        except Exception as e:
+            logger.warning(f"Page store pruning failed: {e}")
+        if llm is None:
+            llm = get_llm_service(
+                provider=provider_name, api_key=api_key, model=model, base_url=base_url,
+                max_concurrency=config.llm_max_concurrency, rpm=config.llm_rpm, tpm=config.llm_tpm,
+                max_retries=config.llm_max_retries, cache_prompt=config.llm_cache_prompt, slots=config.llm_slots
+            )
 
-        # 3. Crawl Primary Sources
-        crawled_data = []
-        for source in sources:
-            set_status(f"Processing Source: {source.url}")
+        # 3. Crawl Primary Sources, once for all profiles
+        needed = {s.id for plan in plans for s in plan["sources"]}
+        sources = [s for s in all_sources if s.id in needed]
+        pages_by_source = {}
+        feed_updates = []
+        any_expansion = any(plan["depth"] for plan in plans)
+        sources_end = deadline.stage_end(SOURCES_TIME_SHARE if any_expansion else 1.0)
+        with stage("crawl_sources"):
+            for i, source in enumerate(sources):
+                if deadline.left(sources_end) == 0:
+                    degrade(f"skipped {len(sources) - i} remaining source(s)")
+                    break
+                if not source_health.due(source):
+                    log(f"Skipping {source.url}: backing off after {source.health_failures} failure(s)")
+                    continue
+                set_status(f"Processing Source: {source.url}")
+                started = time.monotonic()
+                error = None
+                try:
+                    if source.source_type in ("feed", "sitemap"):
+                        pages_by_source[source.id] = await ingest_feed(source, sources_end)
+                        # Not modified keeps the previous count
+                        length = len(pages_by_source[source.id]) or None
+                    else:
+                        crawl_cache[source.url] = asyncio.ensure_future(crawl(source.url, page_timeout(sources_end)))
+                        data = await crawl_cache[source.url]
+                        pages_by_source[source.id] = [data]
+                        error, length = data.get("error"), data.get("content_length", 0)
+                        if not error:
+                            log(f"Successfully crawled: {data['title']}")
+                        else:
+                            log(f"Failed to crawl {source.url}: {error}")
+                except Exception as e:
+                    error = str(e)
+                    log(f"Failed to crawl {source.url}: {e}")
+                if error:
+                    note = source_health.record_failure(source, error, config.source_failure_limit)
+                    if note:
+                        log(f"Source {source.url}: {note}")
+                else:
+                    source_health.record_success(source, time.monotonic() - started, length)
             try:
-                data = await crawler_service.crawl(source.url)
-                crawled_data.append(data)
-                log(f"Successfully crawled: {data['title']}")
+                db.commit()
             except Exception as e:
-                log(f"Failed to crawl {source.url}: {e}")
-
-        # 4. Expansion Cycles
-        for depth_level in range(1, research_depth + 1):
-            log(f"Expansion Cycle {depth_level} of {research_depth} starting...")
-            set_status(f"Exploring lead layer {depth_level} (Breadth: {research_breadth})...")
-            
-            # Prepare context for LLM to find interesting links from ALL current data
-            current_context = ""
-            all_links = []
-            for item in crawled_data:
-                current_context += f"Source: {item['url']} - Title: {item['title']}\n"
-                all_links.extend(item.get('links', []))
-
-            # Filter links to unique valid ones that we haven't crawled yet
-            already_crawled = set(d['url'] for d in crawled_data)
-            unique_links = list(set([l for l in all_links if l.startswith('http') and l not in already_crawled]))
-            log(f"Cycle {depth_level}: Found {len(unique_links)} new potential links.")
-            
-            # Ask LLM to pick interesting links or suggest search terms
-            expansion_prompt = f"""
-            You are a research assistant. 
-            Based on the following information gathered so far, identifies the next best leads to follow.
-            
-            Your goal is to find information that adds new dimensions, verifying details, or adds depth to the current data.
-            
-            Identify:
-            1. Up to {research_breadth} most relevant external links for further research from the "Available Links" list.
-            2. Up to {research_breadth} specific search queries to find information on key entities or events mentioned but not linked.
-
-            Gathered Intelligence so far:
-            {current_context}
-            
-            Available Links:
-            {json.dumps(unique_links[:50])} 
-            
-            Return ONLY a JSON object with two keys: "links" (array of strings) and "search_terms" (array of strings).
-            Do not include markdown formatting.
-            """
-            
-            log(f"Sending Expansion Prompt (Cycle {depth_level})...")
-            
-            try:
-                expansion_response = await llm.generate(expansion_prompt)
-                # Cleanup potential markdown code blocks
-                clean_json = expansion_response.replace('```json', '').replace('```', '').strip()
-                
+                db.rollback()
+                logger.warning(f"Saving source health failed: {e}")
+
+        async def research(plan: dict):
+            profile = plan["profile"]
+            research_breadth, research_depth = plan["breadth"], plan["depth"]
+            # Each briefing's log starts with the shared crawl
+            logs = list(execution_logs)
+            plog = make_log(logs)
+            prefix = f"[{plan['name']}] " if len(plans) > 1 else ""
+
+            def set_status(status: str):
+                self.current_status = prefix + status
+                plog(status)
+
+            if not plan["sources"]:
+                plog("Error: No active sources found")
+                return {"error": "No active sources found"}
+
+            crawled_data = [page for source in plan["sources"] for page in pages_by_source.get(source.id, [])]
+
+            # 4. Expansion Cycles
+            for depth_level in range(1, research_depth + 1):
+                # Each remaining cycle gets an equal share of the time left; unused time rolls over
+                cycle_end = deadline.stage_end(1.0 / (research_depth - depth_level + 1))
+                if deadline.left(cycle_end) == 0:
+                    degrade(f"{prefix}depth reduced from {research_depth} to {depth_level - 1}", plog)
+                    break
+                plog(f"Expansion Cycle {depth_level} of {research_depth} starting...")
+                set_status(f"Exploring lead layer {depth_level} (Breadth: {research_breadth})...")
+
+                # Prepare context for LLM to find interesting links from ALL current data
+                current_context = ""
+                already_crawled = set(d['url'] for d in crawled_data)
+                candidates = {}
+                for item in crawled_data:
+                    current_context += f"Source: {item['url']} - Title: {item['title']}\n"
+                    # Links are already scored and capped per page; keep each url's best score
+                    for link in map(as_link, item.get('links', [])):
+                        url = link["url"]
+                        if not url.startswith('http') or url in already_crawled:
+                            continue
+                        if url not in candidates or link["score"] > candidates[url]["score"]:
+                            candidates[url] = link
+
+                # Stable sort on first-seen order so the prompt is the same between identical runs
+                unique_links = sorted(candidates.values(), key=lambda l: -l["score"])
+                plog(f"Cycle {depth_level}: Found {len(unique_links)} new potential links.")
+
+                # Ask LLM to pick interesting links or suggest search terms
+                # Static instructions live in the system prompt so the server can reuse its cached prefix;
+                # everything that changes per call goes after it.
+                expansion_prompt = f"""Up to {research_breadth} links and up to {research_breadth} search queries.
+
+Gathered Intelligence so far:
+{current_context}
+Available Links:
+{json.dumps([{"url": l["url"], "text": l["text"]} for l in unique_links[:50]], ensure_ascii=False)}
+"""
+
+                plog(f"Sending Expansion Prompt (Cycle {depth_level})...")
+
                 try:
-                    expansion_data = json.loads(clean_json)
-                except json.JSONDecodeError:
-                    log(f"Failed to parse Expansion JSON in cycle {depth_level}.")
-                    expansion_data = {}
-                
-                target_links = expansion_data.get("links", [])
-                search_terms = expansion_data.get("search_terms", [])
-                
-                log(f"Cycle {depth_level} leads: {len(target_links)} links, {len(search_terms)} search terms")
-                
-                # Perform Web Search for terms
-                if search_terms:
-                    from duckduckgo_search import DDGS
-                    ddgs = DDGS()
-                    for term in search_terms:
-                        set_status(f"Cycle {depth_level} Research: '{term}'")
-                        try:
-                            results = list(ddgs.text(term, max_results=1))
-                            if results:
-                                url = results[0]['href']
-                                log(f"Found lead: {url}")
-                                target_links.append(url)
-                        except Exception as e:
-                            log(f"Search failed for '{term}': {e}")
-                
-                target_links = list(set([l for l in target_links if l not in already_crawled])) # Final dedupe
-                
-                # Crawl Leads
-                for link in target_links:
-                    set_status(f"Processing Depth Level {depth_level} Source: {link}")
+                    with stage("expansion_llm"):
+                        expansion_response = await asyncio.wait_for(
+                            llm.generate(expansion_prompt, system=EXPANSION_SYSTEM_PROMPT, cache_key="expansion"),
+                            deadline.left(cycle_end)
+                        )
+                    # Cleanup potential markdown code blocks
+                    clean_json = expansion_response.replace('```json', '').replace('```', '').strip()
+
                     try:
-                        data = await crawler_service.crawl(link)
-                        crawled_data.append(data)
-                        log(f"Captured: {data['title']}")
-                    except Exception as e:
-                        log(f"Failed to crawl {link}: {e}")
-                        
-            except asyncio.TimeoutError:
-                 log(f"Expansion cycle {depth_level} timed out.")
+                        expansion_data = json.loads(clean_json)
+                    except json.JSONDecodeError:
+                        plog(f"Failed to parse Expansion JSON in cycle {depth_level}.")
+                        expansion_data = {}
+
+                    # Models sometimes echo the {"url", "text"} objects back
+                    target_links = [l["url"] if isinstance(l, dict) else l for l in expansion_data.get("links", [])]
+                    target_links = [l for l in target_links if isinstance(l, str) and l.startswith("http")]
+                    search_terms = expansion_data.get("search_terms", [])
+
+                    plog(f"Cycle {depth_level} leads: {len(target_links)} links, {len(search_terms)} search terms")
+
+                    # Perform Web Search for terms
+                    with stage("search"):
+                        for i, term in enumerate(search_terms):
+                            if deadline.left(cycle_end) == 0:
+                                degrade(f"{prefix}skipped {len(search_terms) - i} search(es) in cycle {depth_level}", plog)
+                                break
+                            set_status(f"Cycle {depth_level} Research: '{term}'")
+                            try:
+                                results = await asyncio.wait_for(self.search.search(term, max_results=1), page_timeout(cycle_end))
+                                if results:
+                                    url = results[0]
+                                    plog(f"Found lead: {url}")
+                                    target_links.append(url)
+                            except Exception as e:
+                                plog(f"Search failed for '{term}': {e}")
+
+                    target_links = list(set([l for l in target_links if l not in already_crawled])) # Final dedupe
+
+                    # Crawl Leads
+                    with stage("crawl_leads"):
+                        for i, link in enumerate(target_links):
+                            if deadline.left(cycle_end) == 0:
+                                degrade(f"{prefix}skipped {len(target_links) - i} lead(s) in cycle {depth_level}", plog)
+                                break
+                            set_status(f"Processing Depth Level {depth_level} Source: {link}")
+                            try:
+                                data = await crawl_once(link, page_timeout(cycle_end))
+                                crawled_data.append(data)
+                                plog(f"Captured: {data['title']}")
+                            except Exception as e:
+                                plog(f"Failed to crawl {link}: {e}")
+
+                except asyncio.TimeoutError:
+                    # Only the deadline bounds the expansion call
+                    degrade(f"{prefix}expansion cycle {depth_level} timed out", plog)
+                except Exception as e:
+                    plog(f"Expansion cycle {depth_level} failed: {type(e).__name__}: {e}")
+
+            # 5. Synthesize Report
+            profile_id = profile.id if profile else None
+            with stage("retrieval"):
+                previous = self.previous_reports(db, config.digest_history, profile_id)
+                query = plan["themes"] + "\n" + self.digest_query(previous)
+                combined_text, retrieval_stats = build_context(
+                    crawled_data, self.pages.get_text, query, config.synthesis_context_chars
+                )
+            plog(f"Selected {retrieval_stats['selected']} of {retrieval_stats['passages']} passages ({retrieval_stats['chars']} chars) for synthesis.")
+
+            previous_digest = format_digests(previous, config.digest_char_budget)
+            if previous_digest:
+                plog(f"Including digest of {len(previous)} previous briefing(s) ({len(previous_digest)} chars).")
+
+            prompt = f"""Current Date and Time: {datetime.now(self.tz).strftime("%A, %B %d, %Y %H:%M")}
+
+Previous Briefings:
+{previous_digest or "None available."}
+
+Input Data:
+{combined_text}
+"""
+
+            set_status("Finalizing Briefing...")
+            try:
+                # Synthesis may use whatever is left, and at least its reserve
+                synthesis_timeout = max(deadline.remaining(), deadline.reserve) if deadline.enabled else None
+                cache_key = "synthesis" + (f":{plan['cache_key']}" if plan["cache_key"] else "")
+                with stage("synthesis"):
+                    report_content = await asyncio.wait_for(
+                        llm.generate(prompt, system=plan["system_prompt"], cache_key=cache_key), synthesis_timeout
+                    )
+                 # Clean formatting
+                report_content = report_content.replace('```markdown', '').replace('```', '').strip()
+                plog("Report generation successful.")
+
+                # 6. Save Report
+                now = datetime.now(self.tz)
+                new_report = Report(
+                    title=f"{plan['title']} - {now.strftime('%Y-%m-%d %H:%M')}",
+                    generated_at=now,
+                    content_markdown=report_content,
+                    content_json={},
+                    digest=build_digest(report_content),
+                    profile_id=profile_id,
+                    logs=logs
+                )
+                db.add(new_report)
+                db.commit()
+                db.refresh(new_report)
+
+                plog(f"Report saved to database (ID: {new_report.id})")
+                return new_report
+
             except Exception as e:
-                log(f"Expansion cycle {depth_level} failed: {type(e).__name__}: {e}")
-
-        # 5. Synthesize Report
-        combined_text = ""
-        for item in crawled_data:
-            combined_text += f"\n\nSource: {item['url']} ({item['title']})\n"
-            combined_text += item['content'][:5000] # Truncate to avoid context limits if naive
-
-        prompt = f"""
-        Current Date and Time: {datetime.now(self.tz).strftime("%A, %B %d, %Y %H:%M")}
-        
-        You are a research assistant generating a Daily Briefing for a trading desk.
-        Review the following gathered information and synthesize a comprehensive report.
-        
-        The report MUST be in Markdown format and follow these structural and formatting rules for maximum readability:
-        
-        1. **Executive Summary**: 
-           - Start with a clear "Market Overview" table.
-           - The table MUST have exactly these three columns: **INDEX / THEME**, **Sentiment**, and **Strength**.
-           - Use short, impactful bullet points below the table.
-           - Limit paragraphs to 3 sentences maximum.
-        ---
-        2. **Key Developments**: 
-           - Break down primary stories into distinct subsections with `###` headers.
-           - Use bolding for key entities and metrics.
-           - Ensure vertical spacing between items.
-        ---
-        3. **Ongoing Situations**: 
-           - Provide concise updates on continuing events.
-           - Highlight any changes since the last report.
-        ---
-        4. **Market Sentiment & Emerging Trends**: 
-           - Analysis of sentiment.
-           - Use the phrase "Early Indicators" to mark emerging trends.
-
-        GENERAL FORMATTING RULES:
-        - Use horizontal rules (`---`) between the four major sections.
-        - Use tables where data can be compared. **IMPORTANT**: Every table row must be on a new line.
-        - Use bolding for emphasis, but do not over-bold.
-        - Prioritize white space.
-        
-        Format heavily with bolding, bullet points, and clear headers.
-
-        Input Data:
-        {combined_text}
-        """
+                plog(f"Report generation failed: {type(e).__name__}: {e}")
+                raise e
 
-        set_status("Finalizing Briefing...")
-        try:
-            report_content = await llm.generate(prompt)
-             # Clean formatting
-            report_content = report_content.replace('```markdown', '').replace('```', '').strip()
-            log("Report generation successful.")
-
-            # 6. Save Report
-            now = datetime.now(self.tz)
-            new_report = Report(
-                title=f"Daily Briefing - {now.strftime('%Y-%m-%d %H:%M')}", 
-                generated_at=now,
-                content_markdown=report_content,
-                content_json={},
-                logs=execution_logs
-            )
-            db.add(new_report)
-            db.commit()
-            db.refresh(new_report)
-            
-            log(f"Report saved to database (ID: {new_report.id})")
-            set_status("Idle")
-            return new_report
+        results = await asyncio.gather(*(research(plan) for plan in plans), return_exceptions=True)
+        by_profile = {(plan["profile"].id if plan["profile"] else None): result for plan, result in zip(plans, results)}
+        run_stats["wall_time"] = time.perf_counter() - run_started
 
-        except Exception as e:
-            log(f"Report generation failed: {e}")
-            set_status("Error")
-            raise e
+        saved = [r for r in results if isinstance(r, Report)]
+        if saved:
+            for source, state in feed_updates:
+                for key, value in state.items():
+                    setattr(source, key, value)
+            db.commit()
+        self.current_status = "Idle" if saved or not any(isinstance(r, Exception) for r in results) else "Error"
+        return [by_profile[profile.id if profile else None] for profile, _, _ in targets]
 
 intelligence_service = IntelligenceService()
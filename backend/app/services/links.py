@@ -0,0 +1,111 @@
+import re
+from typing import List, Optional
+from urllib.parse import urljoin, urldefrag, urlparse
+
+# Links kept per page after scoring; expansion only ever offers the best few
+MAX_LINKS_PER_PAGE = 40
+MAX_ANCHOR_CHARS = 120
+# Below this a link is page furniture (login, privacy, share buttons) and is dropped
+MIN_LINK_SCORE = -4.0
+
+# Page furniture: links here are navigation, not leads
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form"}
+BOILERPLATE_HINTS = re.compile(r"nav|menu|footer|header|sidebar|breadcrumb|share|social|cookie|subscribe|related-links|promo|advert", re.I)
+GENERIC_ANCHORS = {
+    "", "home", "read more", "more", "continue reading", "click here", "here", "login", "log in", "sign in",
+    "sign up", "subscribe", "register", "privacy policy", "privacy", "terms", "terms of use", "cookies",
+    "contact", "contact us", "about", "about us", "advertise", "careers", "next", "previous", "share",
+}
+UTILITY_PATHS = re.compile(
+    r"/(login|signin|sign-in|signup|register|account|subscribe|subscription|privacy|terms|cookie|contact|about|"
+    r"advertise|careers|tag|tags|author|search|feed|rss|newsletter)(/|$)|\.(jpg|jpeg|png|gif|svg|webp|css|js|ico|zip|mp3|mp4)$",
+    re.I,
+)
+SHARE_HOSTS = ("facebook.com", "twitter.com", "x.com", "linkedin.com", "reddit.com", "pinterest.com", "whatsapp.com", "t.me")
+
+def _site(netloc: str) -> str:
+    host = netloc.lower().split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+def _same_site(a: str, b: str) -> bool:
+    return a == b or a.endswith("." + b) or b.endswith("." + a)
+
+def _in_boilerplate(anchor) -> bool:
+    for parent in anchor.parents:
+        name = getattr(parent, "name", None)
+        if name in (None, "[document]", "body", "html"):
+            break
+        if name in BOILERPLATE_TAGS or parent.get("role") in ("navigation", "banner", "contentinfo"):
+            return True
+        hints = " ".join(parent.get("class") or []) + " " + (parent.get("id") or "")
+        if hints.strip() and BOILERPLATE_HINTS.search(hints):
+            return True
+    return False
+
+def score_link(url: str, text: str, in_main: bool, boilerplate: bool, external: bool) -> float:
+    """Cheap relevance prior of a link as a research lead; higher is better."""
+    score = 0.0
+    if in_main:
+        score += 3.0 # Cited from the article body
+    if boilerplate:
+        score -= 2.0
+    words = len(text.split())
+    if text.lower() in GENERIC_ANCHORS:
+        score -= 1.5
+    elif 3 <= words <= 20:
+        score += 1.0 # Headline-like anchor text
+    path = urlparse(url).path
+    if UTILITY_PATHS.search(path):
+        score -= 2.0
+    elif path.count("/") >= 2 or re.search(r"\d|-\w+-", path):
+        score += 0.5 # Looks like an article rather than a section front
+    if external and any(_same_site(_site(urlparse(url).netloc), h) for h in SHARE_HOSTS):
+        score -= 3.0
+    return score
+
+def extract_links(html: str, base_url: str, main_html: Optional[str] = None,
+                  limit: int = MAX_LINKS_PER_PAGE) -> List[dict]:
+    """
+    The page's http(s) links as {"url", "text", "in_main", "external", "score"},
+    best first and at most `limit`; page furniture is dropped. `main_html` is
+    the page's main content (readability's summary); links found there are
+    taken as cited by the article.
+    """
+    if not html:
+        return []
+    from bs4 import BeautifulSoup
+
+    def hrefs(soup) -> list:
+        return [(urldefrag(urljoin(base_url, a["href"].strip()))[0], a) for a in soup.find_all("a", href=True)]
+
+    main_urls = {url for url, _ in hrefs(BeautifulSoup(main_html, "lxml"))} if main_html else set()
+    page_site = _site(urlparse(base_url).netloc)
+    links = {}
+    for position, (url, anchor) in enumerate(hrefs(BeautifulSoup(html, "lxml"))):
+        if not url.startswith(("http://", "https://")) or url == base_url:
+            continue
+        text = " ".join(anchor.get_text(" ", strip=True).split())[:MAX_ANCHOR_CHARS]
+        if not text:
+            text = (anchor.get("title") or anchor.get("aria-label") or "").strip()[:MAX_ANCHOR_CHARS]
+        external = not _same_site(_site(urlparse(url).netloc), page_site)
+        in_main = url in main_urls
+        score = score_link(url, text, in_main, _in_boilerplate(anchor), external)
+        known = links.get(url)
+        if known is None:
+            links[url] = {"url": url, "text": text, "in_main": in_main, "external": external,
+                          "score": score, "position": position}
+        elif score > known["score"]:
+            # Same target linked twice (e.g. headline and image): keep the better placement
+            known.update(text=text or known["text"], in_main=in_main, score=score)
+
+    kept = [l for l in links.values() if l["score"] > MIN_LINK_SCORE]
+    ranked = sorted(kept, key=lambda l: (-l["score"], l["position"]))[:limit]
+    for link in ranked:
+        del link["position"]
+    return ranked
+
+def as_link(link) -> dict:
+    # Crawlers may still hand back bare urls
+    if isinstance(link, str):
+        return {"url": link, "text": "", "in_main": False, "external": False, "score": 0.0}
+    return link
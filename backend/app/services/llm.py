@@ -1,8 +1,5 @@
 from abc import ABC, abstractmethod
 from typing import Optional
-import openai
-import google.generativeai as genai
-import google.generativeai as genai
 from app.core.config import settings
 
 class LLMProvider(ABC):
@@ -13,58 +10,103 @@ class LLMProvider(ABC):
         pass
 
     @abstractmethod
-    async def generate(self, prompt: str) -> str:
-        """Generates text based on the prompt."""
+    async def generate(self, prompt: str, system: Optional[str] = None, cache_key: Optional[str] = None) -> str:
+        """Generates text based on the prompt.
+
+        `system` carries static instructions that should form a stable prefix,
+        `cache_key` groups calls sharing that prefix (used for slot affinity).
+        """
         pass
 
+def build_messages(prompt: str, system: Optional[str] = None) -> list:
+    # System prompt first so identical instructions form a cacheable prefix
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
 class OpenAIProvider(LLMProvider):
     def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        # SDKs are imported on first use so startup doesn't pay for providers nobody uses
+        import openai
+        # Retries are the limiter's job; SDK retries would multiply them and hide failures from the breaker
+        self.client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
         self._model = model
 
     @property
     def name(self) -> str:
         return f"OpenAI {self._model}"
 
-    async def generate(self, prompt: str) -> str:
+    async def generate(self, prompt: str, system: Optional[str] = None, cache_key: Optional[str] = None) -> str:
         response = await self.client.chat.completions.create(
             model=self._model,
-            messages=[{"role": "user", "content": prompt}]
+            messages=build_messages(prompt, system)
         )
         return response.choices[0].message.content or ""
 
 class GeminiProvider(LLMProvider):
     def __init__(self, api_key: str, model: str = "gemini-pro"):
+        import google.generativeai as genai
+        self._genai = genai
         genai.configure(api_key=api_key)
         self._model_name = model
         self.model = genai.GenerativeModel(model)
+        self._system_models = {}
 
     @property
     def name(self) -> str:
         return f"Google {self._model_name}"
 
-    async def generate(self, prompt: str) -> str:
-        response = await self.model.generate_content_async(prompt)
+    async def generate(self, prompt: str, system: Optional[str] = None, cache_key: Optional[str] = None) -> str:
+        model = self.model
+        if system:
+            model = self._system_models.get(system)
+            if model is None:
+                model = self._genai.GenerativeModel(self._model_name, system_instruction=system)
+                self._system_models[system] = model
+        response = await model.generate_content_async(prompt)
         return response.text
 
+_slot_assignments = {}
+
 class LocalProvider(LLMProvider):
-    def __init__(self, base_url: str, model: str = "local-model"):
+    def __init__(self, base_url: str, model: str = "local-model", cache_prompt: bool = True, slots: Optional[int] = None):
         self.base_url = base_url
         self._model = model
+        # llama.cpp extensions to the OpenAI API: reuse the KV cache of the previous
+        # request's common prefix, and pin calls sharing a prefix to the same slot.
+        self.cache_prompt = cache_prompt
+        self.slots = slots
 
     @property
     def name(self) -> str:
         return f"Local {self._model}"
 
-    async def generate(self, prompt: str) -> str:
+    def slot_for(self, cache_key: Optional[str]) -> Optional[int]:
+        if not self.slots or not cache_key:
+            return None
+        # Hand out slots round-robin per server in first-seen order, so distinct
+        # prompt families land on distinct slots and keep them across runs.
+        assignments = _slot_assignments.setdefault(self.base_url, {})
+        if cache_key not in assignments:
+            assignments[cache_key] = len(assignments) % self.slots
+        return assignments[cache_key]
+
+    async def generate(self, prompt: str, system: Optional[str] = None, cache_key: Optional[str] = None) -> str:
         import aiohttp
         # Disable timeout for local LLM (user request)
         timeout = aiohttp.ClientTimeout(total=None)
         
         payload = {
             "model": self._model,
-            "messages": [{"role": "user", "content": prompt}]
+            "messages": build_messages(prompt, system)
         }
+        if self.cache_prompt:
+            payload["cache_prompt"] = True
+        slot = self.slot_for(cache_key)
+        if slot is not None:
+            payload["id_slot"] = slot
         
         async with aiohttp.ClientSession(timeout=timeout) as session:
             async with session.post(f"{self.base_url}/chat/completions", json=payload) as response:
@@ -72,12 +114,30 @@ class LocalProvider(LLMProvider):
                 data = await response.json()
                 return data["choices"][0]["message"]["content"]
 
-def get_llm_service(provider: str, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None) -> LLMProvider:
+# Default parallel calls per provider. llama.cpp serves one request per slot
+# (`--parallel`, default 1); cloud APIs are bounded by RPM/TPM instead.
+DEFAULT_CONCURRENCY = {"openai": 4, "gemini": 4, "local": 1}
+
+def get_llm_service(provider: str, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None,
+                    max_concurrency: Optional[int] = None, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                    max_retries: int = 4, cache_prompt: bool = True, slots: Optional[int] = None) -> LLMProvider:
     if provider == "openai":
-        return OpenAIProvider(api_key=api_key or settings.OPENAI_API_KEY, model=model or "gpt-3.5-turbo")
+        llm = OpenAIProvider(api_key=api_key or settings.OPENAI_API_KEY, model=model or "gpt-3.5-turbo")
+        key = f"openai:{llm._model}"
     elif provider == "gemini":
-        return GeminiProvider(api_key=api_key or settings.GEMINI_API_KEY, model=model or "gemini-pro")
+        llm = GeminiProvider(api_key=api_key or settings.GEMINI_API_KEY, model=model or "gemini-pro")
+        key = f"gemini:{llm._model_name}"
     elif provider == "local":
-        return LocalProvider(base_url=base_url or settings.LOCAL_LLM_URL, model=model or "local")
+        llm = LocalProvider(base_url=base_url or settings.LOCAL_LLM_URL, model=model or "local",
+                            cache_prompt=cache_prompt, slots=slots)
+        # Slots belong to the server, not the model name
+        key = f"local:{llm.base_url}"
     else:
         raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    from app.services.llm_limits import llm_limiters
+    return llm_limiters.wrap(
+        key, llm,
+        max_concurrency=max_concurrency or DEFAULT_CONCURRENCY[provider],
+        rpm=rpm, tpm=tpm, max_retries=max_retries
+    )
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from app.services.llm import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    pass
+
+def _status_of(e: Exception) -> Optional[int]:
+    # openai: status_code, aiohttp: status, google api_core: code
+    for attr in ("status_code", "status", "code"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+def _retry_after(e: Exception) -> Optional[float]:
+    headers = getattr(e, "headers", None)
+    if headers is None:
+        response = getattr(e, "response", None)
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except Exception:
+            return None
+
+def is_retryable(e: Exception) -> bool:
+    if isinstance(e, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = _status_of(e)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection level failures from the SDKs don't carry a status
+    name = type(e).__name__
+    return any(k in name for k in ("Timeout", "Connection", "RateLimit", "ServiceUnavailable", "ServerDisconnected"))
+
+class TokenBucket:
+    """Refills `rate_per_minute` tokens per minute up to `capacity`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Waits until `amount` tokens are available; returns the time spent waiting."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # Set while the one half-open trial call is in flight
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def check(self) -> bool:
+        """Raises while open; returns True when the caller is the half-open probe and must call end_probe()."""
+        state = self.state
+        if state == "open":
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"LLM provider circuit is open, retry in {remaining:.0f}s")
+        if state == "half-open":
+            if self.probing:
+                raise CircuitOpenError("LLM provider circuit is half-open, waiting on a trial call")
+            self.probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # A failed probe in half-open state re-opens immediately
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+class ProviderLimiter:
+    """Concurrency, rate, retry and circuit state shared by every call to one provider endpoint."""
+
+    def __init__(self, key: str, max_concurrency: int = 4, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.key = key
+        self.limits = (max_concurrency, rpm, tpm, max_retries)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker()
+        self.stats = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+            "rate_limited": 0, "circuit_rejections": 0,
+            "in_flight": 0, "queued": 0, "throttle_wait_seconds": 0.0,
+        }
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _attempt(self, fn, prompt: str, *args, **kwargs):
+        self.stats["queued"] += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.stats["queued"] -= 1
+        self.stats["in_flight"] += 1
+        try:
+            if self.request_bucket:
+                self.stats["throttle_wait_seconds"] += await self.request_bucket.acquire()
+            if self.token_bucket:
+                # Rough token estimate, good enough for pacing
+                self.stats["throttle_wait_seconds"] += await self.token_bucket.acquire(len(prompt) / 4)
+            return await fn(prompt, *args, **kwargs)
+        finally:
+            self.stats["in_flight"] -= 1
+            self.semaphore.release()
+
+    async def call(self, fn, prompt: str, *args, **kwargs):
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            try:
+                probe = self.breaker.check()
+            except CircuitOpenError:
+                self.stats["circuit_rejections"] += 1
+                raise
+
+            try:
+                try:
+                    result = await self._attempt(fn, prompt, *args, **kwargs)
+                finally:
+                    # Released before the outcome is recorded, with no await in between
+                    if probe:
+                        self.breaker.end_probe()
+            except Exception as e:
+                if _status_of(e) == 429:
+                    self.stats["rate_limited"] += 1
+                retryable = is_retryable(e)
+                if retryable:
+                    # Only provider-side trouble counts towards opening the circuit
+                    self.breaker.record_failure()
+                if attempt >= self.max_retries or not retryable:
+                    self.stats["failures"] += 1
+                    raise
+                delay = self.backoff(attempt, _retry_after(e))
+                attempt += 1
+                self.stats["retries"] += 1
+                logger.warning(f"LLM call to {self.key} failed ({type(e).__name__}: {e}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.stats["successes"] += 1
+            return result
+
+    def snapshot(self) -> dict:
+        max_concurrency, rpm, tpm, max_retries = self.limits
+        return {
+            **self.stats,
+            "throttle_wait_seconds": round(self.stats["throttle_wait_seconds"], 3),
+            "circuit": self.breaker.state,
+            "max_concurrency": max_concurrency, "rpm": rpm, "tpm": tpm, "max_retries": max_retries,
+        }
+
+class LimitedProvider(LLMProvider):
+    def __init__(self, inner: LLMProvider, limiter: ProviderLimiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    @property
+    def name(self) -> str:
+        return self.inner.name
+
+    async def generate(self, prompt: str, system: Optional[str] = None, cache_key: Optional[str] = None) -> str:
+        return await self.limiter.call(self.inner.generate, prompt, system=system, cache_key=cache_key)
+
+class LimiterRegistry:
+    def __init__(self):
+        self.limiters: Dict[str, ProviderLimiter] = {}
+
+    def get(self, key: str, limits: Tuple) -> ProviderLimiter:
+        limiter = self.limiters.get(key)
+        if limiter is None or limiter.limits != limits:
+            # New limits take effect for new calls; in-flight calls finish on the old limiter
+            limiter = ProviderLimiter(key, *limits)
+            self.limiters[key] = limiter
+        return limiter
+
+    def wrap(self, provider_key: str, provider: LLMProvider, max_concurrency: int, rpm: Optional[int] = None,
+             tpm: Optional[int] = None, max_retries: int = 4) -> LLMProvider:
+        limiter = self.get(provider_key, (max_concurrency, rpm, tpm, max_retries))
+        return LimitedProvider(provider, limiter)
+
+    def stats(self) -> dict:
+        return {key: limiter.snapshot() for key, limiter in self.limiters.items()}
+
+llm_limiters = LimiterRegistry()
@@ -0,0 +1,67 @@
+import hashlib
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from app.core.database import engine
+from app.models import StoredPage
+
+class PageStore:
+    """
+    Compressed, content-addressed storage for crawled page text and HTML.
+
+    The pipeline keeps only small handles (url, title, hashes, links) in memory
+    and loads text back when it is needed, so peak memory does not grow with
+    the number of pages crawled. Identical content is stored once.
+    """
+
+    def __init__(self, bind=engine, level: int = 6):
+        self.bind = bind
+        self.level = level
+
+    def put(self, content: str) -> Optional[str]:
+        if not content:
+            return None
+        raw = content.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        now = datetime.now(timezone.utc)
+        stmt = insert(StoredPage).values(hash=digest, data=zlib.compress(raw, self.level), size=len(raw), last_seen=now)
+        # Already stored: only refresh last_seen so retention keeps it
+        stmt = stmt.on_conflict_do_update(index_elements=[StoredPage.hash], set_={"last_seen": now})
+        with self.bind.begin() as conn:
+            conn.execute(stmt)
+        return digest
+
+    def get(self, digest: Optional[str], limit: Optional[int] = None) -> str:
+        if not digest:
+            return ""
+        with self.bind.connect() as conn:
+            data = conn.execute(select(StoredPage.data).where(StoredPage.hash == digest)).scalar()
+        if data is None:
+            return ""
+        if limit is None:
+            return zlib.decompress(data).decode("utf-8")
+        # Only inflate as much as the caller needs (utf-8 is at most 4 bytes per char)
+        inflater = zlib.decompressobj()
+        chunk = inflater.decompress(data, limit * 4)
+        return chunk.decode("utf-8", errors="ignore")[:limit]
+
+    def put_page(self, data: dict) -> dict:
+        """Stores a crawl result and returns its lightweight handle."""
+        handle = {k: v for k, v in data.items() if k not in ("content", "html")}
+        content = data.get("content") or ""
+        handle["content_hash"] = self.put(content)
+        handle["html_hash"] = self.put(data.get("html") or "")
+        handle["content_length"] = len(content)
+        return handle
+
+    def get_text(self, handle: dict, limit: Optional[int] = None) -> str:
+        return self.get(handle.get("content_hash"), limit)
+
+    def prune(self, max_age_days: int) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        with self.bind.begin() as conn:
+            return conn.execute(delete(StoredPage).where(StoredPage.last_seen < cutoff)).rowcount
+
+page_store = PageStore()
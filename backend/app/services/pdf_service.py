@@ -1,6 +1,8 @@
-import markdown
-from playwright.async_api import async_playwright
+import asyncio
 import os
+import re
+from contextlib import asynccontextmanager
+from app.services.render_service import render_service
 
 class PDFService:
     def __init__(self):
@@ -180,27 +182,70 @@ class PDFService:
         </html>
         """
 
-    async def generate_pdf(self, title: str, markdown_content: str, metadata: dict) -> bytes:
-        html_content = markdown.markdown(markdown_content, extensions=['tables', 'fenced_code'])
+    def build_metadata(self, report) -> dict:
+        # Simple Metadata Parsing from Logs (Backend version of frontend logic)
+        source_count = 0
+        model_used = "LuxPrima Hybrid"
+        if report.logs:
+            unique_sources = set()
+            for log in report.logs:
+                if "Initializing LLM Provider:" in log:
+                    model_used = log.split("Initializing LLM Provider:")[1].strip()
+                url_match = re.search(r"Source: (https?://[^\s]+)", log)
+                if url_match:
+                    unique_sources.add(url_match.group(1))
+            source_count = len(unique_sources)
+
+        return {
+            "date": report.generated_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "sources": str(source_count),
+            "model": model_used
+        }
+
+    def render_html(self, title: str, markdown_content: str, metadata: dict) -> str:
+        html_content = render_service.html(markdown_content)
         
-        full_html = self.template.format(
+        return self.template.format(
             title=title,
             content_html=html_content,
             date=metadata.get('date', 'N/A'),
             sources=metadata.get('sources', '0'),
             model=metadata.get('model', 'LuxPrima Hybrid')
         )
-        
+
+    @asynccontextmanager
+    async def renderer(self, workers: int = 1):
+        """
+        Yields `render(title, markdown_content, metadata) -> bytes` backed by one
+        browser, rendering at most `workers` PDFs at a time in separate pages.
+        """
+        from playwright.async_api import async_playwright
+        slots = asyncio.Semaphore(workers)
+
         async with async_playwright() as p:
             browser = await p.chromium.launch()
-            page = await browser.new_page()
-            await page.set_content(full_html, wait_until="networkidle")
-            pdf_bytes = await page.pdf(
-                format="A4",
-                margin={"top": "20px", "bottom": "20px", "left": "20px", "right": "20px"},
-                print_background=True
-            )
-            await browser.close()
-            return pdf_bytes
+
+            async def render(title: str, markdown_content: str, metadata: dict) -> bytes:
+                full_html = self.render_html(title, markdown_content, metadata)
+                async with slots:
+                    page = await browser.new_page()
+                    try:
+                        await page.set_content(full_html, wait_until="networkidle")
+                        return await page.pdf(
+                            format="A4",
+                            margin={"top": "20px", "bottom": "20px", "left": "20px", "right": "20px"},
+                            print_background=True
+                        )
+                    finally:
+                        await page.close()
+
+            try:
+                yield render
+            finally:
+                await browser.close()
+
+    async def generate_pdf(self, title: str, markdown_content: str, metadata: dict) -> bytes:
+        async with self.renderer() as render:
+            return await render(title, markdown_content, metadata)
 
 pdf_service = PDFService()
@@ -0,0 +1,270 @@
+import asyncio
+import collections.abc
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 100 Hz, like py-spy's default; cheap enough to leave on for a whole run
+SAMPLE_INTERVAL = 0.01
+MAX_STACK_DEPTH = 64
+# How often the loop is asked to wake up; any extra delay is lag
+LAG_INTERVAL = 0.05
+# A single task step (code between two awaits) this long blocks everything else
+SLOW_STEP_SECONDS = 0.1
+TOP_ENTRIES = 25
+
+def _frame_label(code) -> str:
+    path = code.co_filename.replace(os.sep, "/")
+    short = "/".join(path.rsplit("/", 2)[-2:])
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({short}:{code.co_firstlineno})"
+
+def _coro_name(coro) -> str:
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+class _TaskStats:
+    __slots__ = ("count", "wall_total", "wall_max", "busy_total", "busy_max", "steps")
+
+    def __init__(self):
+        self.count = 0
+        self.wall_total = self.wall_max = 0.0
+        self.busy_total = self.busy_max = 0.0
+        self.steps = 0
+
+class _TimedCoroutine(collections.abc.Coroutine):
+    """
+    Wraps a task's coroutine to time each step it runs on the loop, which is
+    the time it keeps every other task waiting.
+    """
+
+    def __init__(self, coro, profiler: "RunProfiler", name: str):
+        self._coro = coro
+        self._profiler = profiler
+        self._name = name
+        self.busy = 0.0
+        self.__qualname__ = name
+
+    def _step(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.busy += elapsed
+            self._profiler._record_step(self._name, elapsed)
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+class RunProfiler:
+    """
+    Diagnostics for one report run, all from the standard library:
+
+    - a sampling profile of the event loop thread (folded stacks),
+    - event loop lag: how late a periodic wake-up fires,
+    - per coroutine wall time and busy time (time spent running on the loop),
+      plus the slowest single steps, i.e. what blocked the loop.
+
+    Use as `async with RunProfiler() as profiler:` around the run, then
+    `profiler.artifact()`. The task factory is installed on the whole loop,
+    so only one profiler may run at a time; see `running()`.
+    """
+
+    _active: Optional["RunProfiler"] = None
+
+    @classmethod
+    def running(cls) -> bool:
+        return cls._active is not None
+
+    def __init__(self, sample_interval: float = SAMPLE_INTERVAL, lag_interval: float = LAG_INTERVAL):
+        self.sample_interval = sample_interval
+        self.lag_interval = lag_interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.lags: List[float] = []
+        self.worst_lags: List[tuple] = []
+        self.tasks: Dict[str, _TaskStats] = {}
+        self.slow_steps: List[tuple] = []
+        self.started_at: Optional[datetime] = None
+        self.wall_time = 0.0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._lag_task: Optional[asyncio.Task] = None
+        self._loop = None
+        self._previous_factory = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        if RunProfiler._active is not None:
+            raise RuntimeError("Another run is already being profiled")
+        RunProfiler._active = self
+        self._loop = asyncio.get_running_loop()
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        self._lag_task = self._loop.create_task(self._watch_lag())
+        thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, args=(thread_id,), name="run-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self._started
+        self._stop.set()
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        # Only undo our own factory; anything installed since stays in place
+        if self._loop is not None and self._loop.get_task_factory() == self._task_factory:
+            self._loop.set_task_factory(self._previous_factory)
+        if self._sampler is not None:
+            self._sampler.join(timeout=1.0)
+        if RunProfiler._active is self:
+            RunProfiler._active = None
+
+    def _sample(self, thread_id: int):
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    async def _watch_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lags.append(lag)
+            if lag >= SLOW_STEP_SECONDS:
+                self.worst_lags.append((round(time.perf_counter() - self._started, 3), lag))
+
+    def _task_factory(self, loop, coro, **kwargs):
+        name = _coro_name(coro)
+        timed = _TimedCoroutine(coro, self, name)
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, timed, **kwargs)
+        else:
+            task = asyncio.Task(timed, loop=loop, **kwargs)
+        created = time.perf_counter()
+
+        def done(_):
+            stats = self.tasks.setdefault(name, _TaskStats())
+            wall = time.perf_counter() - created
+            stats.count += 1
+            stats.wall_total += wall
+            stats.wall_max = max(stats.wall_max, wall)
+            stats.busy_total += timed.busy
+            stats.busy_max = max(stats.busy_max, timed.busy)
+
+        task.add_done_callback(done)
+        return task
+
+    def _record_step(self, name: str, elapsed: float):
+        self.tasks.setdefault(name, _TaskStats()).steps += 1
+        if elapsed >= SLOW_STEP_SECONDS:
+            self.slow_steps.append((round(time.perf_counter() - self._started, 3), name, elapsed))
+
+    def folded(self) -> str:
+        """Collapsed stacks, one `frame;frame;frame count` per line (flamegraph.pl, speedscope)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _lag_summary(self) -> dict:
+        if not self.lags:
+            return {"interval": self.lag_interval, "count": 0}
+        ordered = sorted(self.lags)
+        def pct(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+        return {
+            "interval": self.lag_interval,
+            "count": len(ordered),
+            "mean": round(statistics.fmean(ordered), 4),
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "max": round(ordered[-1], 4),
+            "over_100ms": sum(1 for l in ordered if l >= SLOW_STEP_SECONDS),
+            "worst": [{"at": at, "lag": round(lag, 4)} for at, lag in sorted(self.worst_lags, key=lambda w: -w[1])[:TOP_ENTRIES]],
+        }
+
+    def _top_functions(self) -> List[dict]:
+        # Self samples: innermost frame; total samples: anywhere on the stack
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return [
+            {"function": frame, "self": count, "total": total[frame],
+             "self_pct": round(100 * count / max(1, self.samples), 1)}
+            for frame, count in own.most_common(TOP_ENTRIES)
+        ]
+
+    def summary(self) -> dict:
+        """The small part of the artifact, stored uncompressed for listing."""
+        lag = self._lag_summary()
+        busiest = max(self.tasks.items(), key=lambda t: t[1].busy_total, default=None)
+        return {
+            "wall_time": round(self.wall_time, 3),
+            "samples": self.samples,
+            "loop_lag_p95": lag.get("p95"),
+            "loop_lag_max": lag.get("max"),
+            "slow_steps": len(self.slow_steps),
+            "busiest_task": busiest[0] if busiest else None,
+        }
+
+    def artifact(self, **extra) -> dict:
+        tasks = sorted(self.tasks.items(), key=lambda t: -t[1].busy_total)
+        return {
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "wall_time": round(self.wall_time, 3),
+            "sampler": {"interval": self.sample_interval, "samples": self.samples},
+            "top_functions": self._top_functions(),
+            "loop_lag": self._lag_summary(),
+            "tasks": [
+                {"name": name, "count": s.count, "steps": s.steps,
+                 "wall_total": round(s.wall_total, 4), "wall_max": round(s.wall_max, 4),
+                 "busy_total": round(s.busy_total, 4), "busy_max": round(s.busy_max, 4)}
+                for name, s in tasks
+            ],
+            "slow_steps": [
+                {"at": at, "task": name, "seconds": round(elapsed, 4)}
+                for at, name, elapsed in sorted(self.slow_steps, key=lambda s: -s[2])[:TOP_ENTRIES]
+            ],
+            "stacks": self.folded(),
+            **extra,
+        }
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.sqlite import insert
+from app.core.database import engine
+from app.models import RenderedHtml
+
+# Bump whenever the markdown extensions or the sanitiser change, so cached
+# HTML from the previous renderer is no longer served
+RENDERER_VERSION = "1"
+
+ALLOWED_TAGS = {
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "strong", "em", "b", "i",
+    "code", "pre", "blockquote", "hr", "br", "table", "thead", "tbody", "tr", "th", "td",
+    "a", "img", "del", "sup", "sub", "span",
+}
+ALLOWED_ATTRS = frozenset({"href", "src", "alt", "title", "align", "class"})
+
+class RenderService:
+    """
+    Markdown to sanitised HTML, rendered once per distinct report content.
+    Results are cached in the database keyed by the content hash and the
+    renderer version, and shared by the report view, PDFs and emails.
+    """
+
+    def __init__(self, bind=engine):
+        self.bind = bind
+        self._cleaner = None
+
+    def key(self, markdown_content: str) -> str:
+        return hashlib.sha256(f"{RENDERER_VERSION}\n{markdown_content}".encode("utf-8")).hexdigest()
+
+    def render(self, markdown_content: str) -> str:
+        """Renders without the cache."""
+        import markdown
+        from markdown.extensions.tables import TableExtension
+        if self._cleaner is None:
+            from lxml_html_clean import Cleaner
+            self._cleaner = Cleaner(
+                scripts=True, javascript=True, comments=True, style=True, inline_style=True, links=True,
+                meta=True, page_structure=True, processing_instructions=True, embedded=True, frames=True,
+                forms=True, annoying_tags=True, remove_unknown_tags=False, allow_tags=ALLOWED_TAGS,
+                safe_attrs_only=True, safe_attrs=ALLOWED_ATTRS,
+            )
+        # `align` instead of inline styles, which the sanitiser drops
+        html = markdown.markdown(markdown_content, extensions=[TableExtension(use_align_attribute=True), "fenced_code"])
+        # LLM output is untrusted: drop scripts, handlers, javascript: links and embeds
+        return self._cleaner.clean_html(f'<div class="report">{html}</div>')
+
+    def html(self, markdown_content: str) -> str:
+        markdown_content = markdown_content or ""
+        key = self.key(markdown_content)
+        now = datetime.now(timezone.utc)
+        with self.bind.connect() as conn:
+            cached = conn.execute(select(RenderedHtml.html).where(RenderedHtml.key == key)).scalar()
+        if cached is not None:
+            return cached
+
+        html = self.render(markdown_content)
+        stmt = insert(RenderedHtml).values(key=key, version=RENDERER_VERSION, html=html, created_at=now)
+        # Rendered concurrently elsewhere: same key, same output
+        stmt = stmt.on_conflict_do_nothing(index_elements=[RenderedHtml.key])
+        with self.bind.begin() as conn:
+            conn.execute(stmt)
+        return html
+
+    def prune(self, max_age_days: int) -> int:
+        """Drops HTML from older renderer versions and entries past retention (re-rendered on demand)."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        with self.bind.begin() as conn:
+            return conn.execute(delete(RenderedHtml).where(or_(
+                RenderedHtml.version != RENDERER_VERSION, RenderedHtml.created_at < cutoff
+            ))).rowcount
+
+render_service = RenderService()
@@ -0,0 +1,162 @@
+import hashlib
+import html
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.core.database import engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+# External-content FTS5 index over reports; triggers keep it in sync with every
+# insert, update and delete, whichever code path performs them.
+REPORTS_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+        title, content_markdown, content='reports', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON reports BEGIN
+        INSERT INTO reports_fts(rowid, title, content_markdown) VALUES (new.id, new.title, new.content_markdown);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, title, content_markdown) VALUES ('delete', old.id, old.title, old.content_markdown);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reports_fts_au AFTER UPDATE ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, title, content_markdown) VALUES ('delete', old.id, old.title, old.content_markdown);
+        INSERT INTO reports_fts(rowid, title, content_markdown) VALUES (new.id, new.title, new.content_markdown);
+    END""",
+]
+
+# Crawled page text, written by the pipeline when `index_page_text` is enabled
+PAGES_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+        title, body, url UNINDEXED, hash UNINDEXED, crawled_at UNINDEXED, tokenize='porter unicode61'
+    )""",
+]
+
+# snippet() wraps matches in these; the text is escaped before they become <mark> tags,
+# since crawled page text is third-party content
+MARK_OPEN, MARK_CLOSE = "\x02", "\x03"
+
+def _highlight(snippet: Optional[str]) -> Optional[str]:
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_OPEN, "<mark>").replace(MARK_CLOSE, "</mark>")
+
+class ReportSearchService:
+    def __init__(self, bind=engine):
+        self.bind = bind
+        self.available = False
+
+    def create_schema(self, conn):
+        """Creates the FTS tables and triggers (run as a migration)."""
+        created = not conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='reports_fts'"
+        )).first()
+        for statement in REPORTS_FTS_SCHEMA + PAGES_FTS_SCHEMA:
+            conn.execute(text(statement))
+        if created:
+            # Index reports that existed before the FTS table
+            conn.execute(text("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')"))
+
+    def detect(self):
+        with self.bind.connect() as conn:
+            self.available = bool(conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='reports_fts'"
+            )).first())
+        if not self.available:
+            logger.warning("Full-text search unavailable, falling back to LIKE queries")
+
+    def _quoted(self, query: str) -> str:
+        # Treat every word as a literal phrase when the query isn't valid FTS5 syntax
+        return " ".join('"' + token.replace('"', '""') + '"' for token in query.split())
+
+    def _run(self, sql: str, params: dict):
+        with self.bind.connect() as conn:
+            try:
+                return conn.execute(text(sql), params).mappings().all()
+            except OperationalError:
+                params = {**params, "q": self._quoted(params["q"])}
+                return conn.execute(text(sql), params).mappings().all()
+
+    def search_reports(self, query: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                       limit: int = 20, offset: int = 0) -> List[dict]:
+        filters, params = "", {"q": query, "limit": limit, "offset": offset, "mark_open": MARK_OPEN, "mark_close": MARK_CLOSE}
+        # generated_at is stored as "YYYY-MM-DD HH:MM:SS[.ffffff]" text in SQLite
+        if date_from:
+            filters += " AND r.generated_at >= :date_from"
+            params["date_from"] = date_from.strftime("%Y-%m-%d %H:%M:%S")
+        if date_to:
+            filters += " AND r.generated_at <= :date_to"
+            params["date_to"] = date_to.strftime("%Y-%m-%d %H:%M:%S.999999")
+
+        if not self.available:
+            like = f"%{query}%"
+            rows = self._like_reports(like, filters, params)
+            return [{**row, "snippet": _highlight(row["snippet"])} for row in rows]
+
+        rows = self._run(f"""
+            SELECT r.id, r.title, r.generated_at,
+                   snippet(reports_fts, 1, :mark_open, :mark_close, '…', 24) AS snippet,
+                   bm25(reports_fts, 5.0, 1.0) AS rank
+            FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid
+            WHERE reports_fts MATCH :q{filters}
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """, params)
+        return [{**row, "snippet": _highlight(row["snippet"])} for row in rows]
+
+    def _like_reports(self, like: str, filters: str, params: dict):
+        with self.bind.connect() as conn:
+            return conn.execute(text(f"""
+                SELECT r.id, r.title, r.generated_at, substr(r.content_markdown, 1, 200) AS snippet, 0.0 AS rank
+                FROM reports r
+                WHERE (r.title LIKE :like OR r.content_markdown LIKE :like){filters}
+                ORDER BY r.generated_at DESC
+                LIMIT :limit OFFSET :offset
+            """), {**params, "like": like}).mappings().all()
+
+    def search_pages(self, query: str, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                     limit: int = 20, offset: int = 0) -> List[dict]:
+        if not self.available:
+            return []
+        filters, params = "", {"q": query, "limit": limit, "offset": offset, "mark_open": MARK_OPEN, "mark_close": MARK_CLOSE}
+        if date_from:
+            filters += " AND crawled_at >= :date_from"
+            params["date_from"] = date_from.isoformat()
+        if date_to:
+            filters += " AND crawled_at <= :date_to"
+            params["date_to"] = date_to.isoformat()
+        rows = self._run(f"""
+            SELECT url, title, crawled_at,
+                   snippet(pages_fts, 1, :mark_open, :mark_close, '…', 24) AS snippet,
+                   bm25(pages_fts, 5.0, 1.0) AS rank
+            FROM pages_fts
+            WHERE pages_fts MATCH :q{filters}
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """, params)
+        return [{**row, "snippet": _highlight(row["snippet"])} for row in rows]
+
+    def index_page(self, handle: dict, body: str, crawled_at: datetime):
+        if not self.available or not body or not handle.get("content_hash"):
+            return
+        # Deterministic rowid per (content, url) so re-crawls are a cheap rowid lookup
+        rowid = int(hashlib.sha256(f"{handle['content_hash']}|{handle['url']}".encode()).hexdigest()[:15], 16)
+        with self.bind.begin() as conn:
+            exists = conn.execute(text("SELECT 1 FROM pages_fts WHERE rowid = :rowid"), {"rowid": rowid}).first()
+            if not exists:
+                conn.execute(text(
+                    "INSERT INTO pages_fts(rowid, title, body, url, hash, crawled_at) "
+                    "VALUES (:rowid, :title, :body, :url, :hash, :crawled_at)"
+                ), {"rowid": rowid, "title": handle.get("title") or "", "body": body, "url": handle["url"],
+                    "hash": handle["content_hash"], "crawled_at": crawled_at.isoformat()})
+
+    def prune_pages(self):
+        """Drops indexed page text whose stored page has been pruned."""
+        if not self.available:
+            return
+        with self.bind.begin() as conn:
+            conn.execute(text("DELETE FROM pages_fts WHERE hash NOT IN (SELECT hash FROM page_store)"))
+
+report_search = ReportSearchService()
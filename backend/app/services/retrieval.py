@@ -0,0 +1,154 @@
+import re
+import zlib
+from typing import Callable, List, Tuple
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9\-\.%$]*[a-z0-9%]|[a-z0-9]")
+STOPWORDS = set("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def chunk_spans(text: str, size: int = 800, overlap: int = 150) -> List[Tuple[int, int]]:
+    """Splits text into ~`size` character windows, preferring to cut at line breaks."""
+    spans = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            cut = text.rfind("\n", start + size // 2, end)
+            if cut != -1:
+                end = cut
+        spans.append((start, end))
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+    return spans
+
+class PassageIndex:
+    """
+    BM25 over hashed term features, stored as flat (passage, feature, count)
+    arrays so scoring a query is a handful of vectorised NumPy operations.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, k1: float = 1.5, b: float = 0.75):
+        self.n_features = n_features
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Tuple[int, int, int]] = [] # (page index, start, end)
+        self._features: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+        self._lengths: List[int] = []
+        self._built = None
+
+    def _hash(self, tokens: List[str]) -> np.ndarray:
+        # crc32 rather than hash() so features are stable across processes
+        return np.fromiter((zlib.crc32(t.encode()) % self.n_features for t in tokens), dtype=np.int64, count=len(tokens))
+
+    def add_page(self, page_idx: int, text: str, size: int = 800, overlap: int = 150):
+        for start, end in chunk_spans(text, size, overlap):
+            tokens = tokenize(text[start:end])
+            if not tokens:
+                continue
+            features, counts = np.unique(self._hash(tokens), return_counts=True)
+            self.passages.append((page_idx, start, end))
+            self._features.append(features)
+            self._counts.append(counts.astype(np.float32))
+            self._lengths.append(len(tokens))
+        self._built = None
+
+    def _build(self):
+        if self._built is None:
+            sizes = np.fromiter((len(f) for f in self._features), dtype=np.int64, count=len(self._features))
+            doc_ids = np.repeat(np.arange(len(self._features)), sizes)
+            features = np.concatenate(self._features) if self._features else np.zeros(0, dtype=np.int64)
+            counts = np.concatenate(self._counts) if self._counts else np.zeros(0, dtype=np.float32)
+            lengths = np.asarray(self._lengths, dtype=np.float32)
+            df = np.bincount(features, minlength=self.n_features)
+            n = len(self._features)
+            idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+            avgdl = lengths.mean() if n else 1.0
+            # Precompute the BM25 term weight of every (passage, feature) entry once
+            norm = counts + self.k1 * (1 - self.b + self.b * lengths[doc_ids] / avgdl)
+            weights = idf[features] * counts * (self.k1 + 1) / norm
+            self._built = (doc_ids, features, weights)
+        return self._built
+
+    def score(self, query: str) -> np.ndarray:
+        doc_ids, features, weights = self._build()
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        tokens = tokenize(query)
+        if not tokens or not len(features):
+            return scores
+        query_weights = np.zeros(self.n_features, dtype=np.float32)
+        np.add.at(query_weights, self._hash(tokens), 1.0)
+        entry_weights = query_weights[features]
+        mask = entry_weights > 0
+        return np.bincount(doc_ids[mask], weights=weights[mask] * entry_weights[mask], minlength=len(self.passages)).astype(np.float32)
+
+def select_passages(index: PassageIndex, scores: np.ndarray, budget: int) -> List[int]:
+    """
+    Picks passages within a character budget: the best passage of every page
+    first (so each source keeps a voice), then the highest scoring remainder.
+    """
+    order = np.argsort(-scores, kind="stable")
+    chosen, used, seen_pages = [], 0, set()
+    for i in order:
+        page_idx, start, end = index.passages[i]
+        if page_idx not in seen_pages and used + (end - start) <= budget:
+            seen_pages.add(page_idx)
+            chosen.append(int(i))
+            used += end - start
+    chosen_set = set(chosen)
+    for i in order:
+        if i in chosen_set:
+            continue
+        page_idx, start, end = index.passages[i]
+        if scores[i] <= 0 or used + (end - start) > budget:
+            continue
+        chosen.append(int(i))
+        used += end - start
+    return chosen
+
+def build_context(pages: List[dict], load_text: Callable[[dict], str], query: str, budget: int) -> Tuple[str, dict]:
+    """Returns the synthesis input assembled from the most relevant passages, plus stats."""
+    index = PassageIndex()
+    seen_content = set()
+    for idx, page in enumerate(pages):
+        # Mirrors and duplicate URLs share a content hash; index their text once
+        content_hash = page.get("content_hash")
+        if content_hash in seen_content:
+            continue
+        if content_hash:
+            seen_content.add(content_hash)
+        text = load_text(page)
+        if text:
+            index.add_page(idx, text)
+    scores = index.score(query)
+    chosen = select_passages(index, scores, budget)
+
+    by_page = {}
+    for i in chosen:
+        page_idx, start, end = index.passages[i]
+        by_page.setdefault(page_idx, []).append((start, end))
+
+    combined_text = ""
+    for page_idx, page in enumerate(pages):
+        spans = by_page.get(page_idx)
+        if not spans:
+            continue
+        # Text is reloaded one page at a time so only selected passages stay in memory
+        text = load_text(page)
+        combined_text += f"\n\nSource: {page['url']} ({page['title']})\n"
+        merged = []
+        for start, end in sorted(spans):
+            # Neighbouring chunks overlap; join them rather than repeating text
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        combined_text += "\n...\n".join(text[start:end] for start, end in merged)
+    return combined_text, {"passages": len(index.passages), "selected": len(chosen), "chars": len(combined_text)}
@@ -1,13 +1,19 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, engine
 from app.services.intelligence import intelligence_service
-from app.models import Schedule
+from app.services.email_service import email_service
+from app.models import Schedule, Report, DistributionList, ResearchProfile
+from app.services.settings_service import settings_service
 try:
     from zoneinfo import ZoneInfo
 except ImportError:
     from backports.zoneinfo import ZoneInfo
+import asyncio
+import hashlib
 import logging
 from app.core.config import settings
 
@@ -16,28 +22,70 @@ logger = logging.getLogger(__name__)
 class SchedulerService:
     def __init__(self):
         self.tz = ZoneInfo(settings.APP_TIMEZONE)
-        self.scheduler = AsyncIOScheduler(timezone=self.tz)
+        # Persist jobs (and their next run times) in the app database so restarts
+        # neither lose nor duplicate runs; misfires are resolved per job below.
+        self.scheduler = AsyncIOScheduler(
+            timezone=self.tz,
+            jobstores={"default": SQLAlchemyJobStore(engine=engine)}
+        )
+        # Serialises runs across schedules so they don't fight over the browser and LLM
+        self.run_lock = asyncio.Lock()
+        # Schedules due but not yet run; runs starting together share one crawl
+        self.pending = set()
+        # Auto-delivery tasks; they run outside run_lock so a slow mail server can't hold up the next run
+        self.deliveries = set()
 
     def start(self):
         self.scheduler.start()
 
-    def add_job(self, schedule_id: int, time_str: str):
-        hour, minute = map(int, time_str.split(":"))
-        trigger = CronTrigger(hour=hour, minute=minute, timezone=self.tz)
-        
-        job_id = str(schedule_id)
-        
-        # Remove if exists
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
+    def build_trigger(self, schedule: Schedule):
+        jitter = schedule.jitter or None
+        if schedule.cron:
+            trigger = CronTrigger.from_crontab(schedule.cron, timezone=self.tz)
+            trigger.jitter = jitter
+            return trigger
+        if schedule.interval_minutes:
+            return IntervalTrigger(minutes=schedule.interval_minutes, timezone=self.tz, jitter=jitter)
+        hour, minute = map(int, schedule.time.split(":"))
+        return CronTrigger(hour=hour, minute=minute, timezone=self.tz, jitter=jitter)
+
+    def _fingerprint(self, schedule: Schedule) -> str:
+        # Stored as the job name so unchanged schedules keep their persisted next run time
+        config = (
+            schedule.time, schedule.cron, schedule.interval_minutes, schedule.jitter,
+            schedule.coalesce, schedule.misfire_grace_time, schedule.max_instances,
+        )
+        return hashlib.sha1(repr(config).encode()).hexdigest()[:16]
+
+    def add_job(self, schedule: Schedule):
+        job_id = str(schedule.id)
+        fingerprint = self._fingerprint(schedule)
+
+        existing = self.scheduler.get_job(job_id)
+        if existing and existing.name == fingerprint:
+            return
 
         self.scheduler.add_job(
-            self.run_report_job,
-            trigger=trigger,
+            run_scheduled_report,
+            trigger=self.build_trigger(schedule),
+            args=[schedule.id],
             id=job_id,
+            name=fingerprint,
+            coalesce=schedule.coalesce if schedule.coalesce is not None else True,
+            # None is unlimited grace to APScheduler; 0 asks for none, so give it the least there is
+            misfire_grace_time=max(1, schedule.misfire_grace_time) if schedule.misfire_grace_time is not None else None,
+            # Runs are serialised by run_lock: extra instances queue behind the running one instead of being skipped
+            max_instances=schedule.max_instances or 1,
             replace_existing=True
         )
-        logger.info(f"Scheduled job {job_id} for {time_str}")
+        logger.info(f"Scheduled job {job_id} ({self.describe(schedule)})")
+
+    def describe(self, schedule: Schedule) -> str:
+        if schedule.cron:
+            return f"cron '{schedule.cron}'"
+        if schedule.interval_minutes:
+            return f"every {schedule.interval_minutes} min"
+        return f"daily at {schedule.time}"
 
     def remove_job(self, schedule_id: int):
         job_id = str(schedule_id)
@@ -49,19 +97,102 @@ class SchedulerService:
         db = SessionLocal()
         try:
             schedules = db.query(Schedule).filter(Schedule.is_active == True).all()
+            active_ids = set()
             for schedule in schedules:
-                self.add_job(schedule.id, schedule.time)
+                try:
+                    self.add_job(schedule)
+                    active_ids.add(str(schedule.id))
+                except Exception as e:
+                    logger.error(f"Could not schedule {schedule.id}: {e}")
+            # Drop persisted jobs whose schedule was deleted or deactivated while we were down
+            for job in self.scheduler.get_jobs():
+                if job.id not in active_ids:
+                    self.scheduler.remove_job(job.id)
+        finally:
+            db.close()
+
+    async def run_report_job(self, schedule_id: int = None):
+        db = SessionLocal()
+        try:
+            window = settings_service.get(db).profile_batch_seconds
         finally:
             db.close()
+        self.pending.add(schedule_id)
+        # Give other schedules due in the same window the chance to join this run
+        await asyncio.sleep(window)
+        async with self.run_lock:
+            if schedule_id not in self.pending:
+                return # Already run as part of another schedule's batch
+            batch, self.pending = self.pending, set()
+            logger.info(f"Running scheduled report generation (schedules {sorted(batch, key=str)})...")
+            db = SessionLocal()
+            try:
+                targets = []
+                for sid in batch:
+                    schedule = db.query(Schedule).filter(Schedule.id == sid).first() if sid else None
+                    profile = None
+                    if schedule and schedule.profile_id is not None:
+                        profile = db.query(ResearchProfile).filter(ResearchProfile.id == schedule.profile_id).first()
+                        if profile is None or not profile.is_active:
+                            logger.warning(f"Schedule {sid}: profile {schedule.profile_id} missing or inactive, skipped")
+                            continue
+                    targets.append((
+                        profile,
+                        schedule.research_breadth if schedule else None,
+                        schedule.research_depth if schedule else None
+                    ))
+                if not targets:
+                    return
+                try:
+                    results = await intelligence_service.generate_reports(db, targets)
+                except Exception as e:
+                    logger.error(f"Scheduled report failed: {e}")
+                    results = []
+                for report in results:
+                    if isinstance(report, Exception):
+                        logger.error(f"Scheduled report failed: {report}")
+                report_ids = [report.id for report in results if isinstance(report, Report)]
+                if report_ids:
+                    task = asyncio.create_task(self.deliver_reports(report_ids))
+                    self.deliveries.add(task)
+                    task.add_done_callback(self.deliveries.discard)
+            finally:
+                db.close()
 
-    async def run_report_job(self):
-        logger.info("Running scheduled report generation...")
+    async def deliver_reports(self, report_ids: list):
+        # Own session: the run's session is closed by the time delivery gets going
         db = SessionLocal()
         try:
-            await intelligence_service.generate_daily_report(db)
-        except Exception as e:
-            logger.error(f"Scheduled report failed: {e}")
+            for report_id in report_ids:
+                report = db.query(Report).filter(Report.id == report_id).first()
+                if report is None:
+                    continue
+                try:
+                    await self.deliver_report(db, report)
+                except Exception as e:
+                    logger.error(f"Scheduled delivery of report {report_id} failed: {e}")
         finally:
             db.close()
 
+    async def deliver_report(self, db: Session, report: Report):
+        lists = [
+            dist_list for dist_list in db.query(DistributionList).filter(
+                DistributionList.is_active == True, DistributionList.auto_send == True
+            ).all()
+            if not dist_list.profile_ids or report.profile_id in dist_list.profile_ids
+        ]
+        if not lists:
+            return
+        delivery = await email_service.deliver_to_lists(db, report, lists)
+        for list_name, results in delivery.items():
+            sent = sum(1 for r in results if r["ok"])
+            logger.info(f"Delivered report {report.id} to '{list_name}': {sent}/{len(results)} recipients")
+            for r in results:
+                if not r["ok"]:
+                    logger.warning(f"Delivery to {r['email']} ({list_name}) failed: {r['error']}")
+
 scheduler_service = SchedulerService()
+
+async def run_scheduled_report(schedule_id: int):
+    # Module-level entry point so the persistent job store can reference it by name
+    await scheduler_service.run_report_job(schedule_id)
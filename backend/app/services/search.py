@@ -0,0 +1,14 @@
+import asyncio
+from typing import List
+
+class SearchService:
+    def _sync_search(self, term: str, max_results: int) -> List[str]:
+        from duckduckgo_search import DDGS
+        results = DDGS().text(term, max_results=max_results)
+        return [r['href'] for r in results or [] if r.get('href')]
+
+    async def search(self, term: str, max_results: int = 1) -> List[str]:
+        # duckduckgo_search is synchronous, keep it off the event loop
+        return await asyncio.to_thread(self._sync_search, term, max_results)
+
+search_service = SearchService()
@@ -0,0 +1,133 @@
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from app.models import Setting
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AppConfig(BaseModel):
+    """Immutable, typed snapshot of the `settings` table."""
+    llm_provider: Optional[str] = None
+    llm_api_key: Optional[str] = None
+    llm_model: Optional[str] = None
+    llm_base_url: Optional[str] = None
+    llm_max_concurrency: Optional[int] = None # Defaults per provider, see llm.DEFAULT_CONCURRENCY
+    llm_rpm: Optional[int] = None
+    llm_tpm: Optional[int] = None
+    llm_max_retries: int = 4
+    llm_cache_prompt: bool = True # llama.cpp `cache_prompt`
+    llm_slots: Optional[int] = None # llama.cpp `--parallel`; enables slot pinning when set
+    research_breadth: int = 3
+    research_depth: int = 1
+    page_store_retention_days: int = 30
+    index_page_text: bool = False # Add crawled page text to the full-text search index
+    synthesis_context_chars: int = 40000 # Budget for passages selected into the synthesis prompt
+    digest_history: int = 2 # Previous briefings whose digest is fed into synthesis
+    digest_char_budget: int = 1600 # Roughly 400 tokens
+    run_deadline_seconds: int = 1800 # Wall-clock budget of a report run; 0 disables
+    synthesis_reserve_seconds: int = 300 # Part of the deadline kept for synthesis
+    page_timeout_seconds: int = 60 # Upper bound of the learnt per-host page timeout
+    feed_max_items: int = 10 # New items taken per feed or sitemap source and run
+    source_failure_limit: int = 8 # Consecutive failures before a source is deactivated; 0 never deactivates
+    profile_batch_seconds: int = 30 # Schedules firing within this window share one crawl
+    export_pdf_workers: int = 3 # PDFs rendered in parallel by a bulk export
+    profiling_enabled: bool = False # Capture a profile of every report run
+
+    smtp_host: Optional[str] = None
+    smtp_port: int = 587
+    smtp_user: Optional[str] = None
+    smtp_pass: Optional[str] = None
+    smtp_sender: Optional[str] = None
+    smtp_stream: Optional[str] = None
+
+    # Every stored key, including ones without a typed field above
+    values: Dict[str, str] = {}
+
+    class Config:
+        frozen = True
+
+    @field_validator("research_breadth", "research_depth", "llm_max_retries", "page_store_retention_days",
+                     "digest_history", "digest_char_budget", "run_deadline_seconds", "synthesis_reserve_seconds",
+                     "profile_batch_seconds", "source_failure_limit")
+    @classmethod
+    def non_negative(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError("must not be negative")
+        return v
+
+    @field_validator("llm_max_concurrency", "llm_rpm", "llm_tpm", "llm_slots", "synthesis_context_chars",
+                     "page_timeout_seconds", "feed_max_items", "export_pdf_workers")
+    @classmethod
+    def positive_or_unset(cls, v: Optional[int]) -> Optional[int]:
+        if v is not None and v < 1:
+            raise ValueError("must be at least 1")
+        return v
+
+    @field_validator("smtp_port")
+    @classmethod
+    def valid_port(cls, v: int) -> int:
+        if not (0 < v < 65536):
+            raise ValueError("must be between 1 and 65535")
+        return v
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.values.get(key, default)
+
+def _typed_fields(values: Dict[str, str]) -> Dict[str, str]:
+    # Empty strings mean "unset" in the settings UI, so let the defaults apply
+    return {k: v for k, v in values.items() if k in AppConfig.model_fields and k != "values" and v != ""}
+
+def validate_settings(values: Dict[str, str]) -> List[str]:
+    """Returns human readable errors for the typed keys in `values`."""
+    try:
+        AppConfig(**_typed_fields(values))
+        return []
+    except ValidationError as e:
+        return [f"{err['loc'][0]}: {err['msg']}" for err in e.errors()]
+
+class SettingsService:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[AppConfig] = None
+
+    def _build(self, values: Dict[str, str]) -> AppConfig:
+        typed = _typed_fields(values)
+        try:
+            return AppConfig(values=values, **typed)
+        except ValidationError as e:
+            # Bad values already in the DB fall back to defaults rather than breaking runs
+            bad = {err["loc"][0] for err in e.errors()}
+            logger.warning(f"Ignoring invalid settings: {', '.join(sorted(bad))}")
+            return AppConfig(values=values, **{k: v for k, v in typed.items() if k not in bad})
+
+    def get(self, db: Session) -> AppConfig:
+        """Returns the cached snapshot, loading it from the DB on first use or after invalidation."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                rows = db.query(Setting).all()
+                self._snapshot = self._build({s.key: s.value for s in rows})
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def update(self, db: Session, items: List[Tuple[str, str]]) -> AppConfig:
+        """Writes settings through to the DB, then replaces the cached snapshot."""
+        for key, value in items:
+            setting = db.query(Setting).filter(Setting.key == key).first()
+            if not setting:
+                setting = Setting(key=key, value=value)
+                db.add(setting)
+            else:
+                setting.value = value
+        db.commit()
+        self.invalidate()
+        return self.get(db)
+
+settings_service = SettingsService()
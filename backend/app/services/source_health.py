@@ -0,0 +1,111 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures after which a source is skipped for a while
+BACKOFF_AFTER = 2
+BACKOFF_BASE = timedelta(hours=1)
+MAX_BACKOFF = timedelta(hours=24)
+# Weight of the newest latency in the smoothed value
+LATENCY_ALPHA = 0.3
+# Sources probed at once by a bulk import
+PROBE_CONCURRENCY = 8
+# Probes use plain HTTP, so they needn't wait as long as a browser page load
+PROBE_TIMEOUT = 20.0
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands DateTime columns back naive
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+class SourceHealth:
+    """
+    Per-source health kept on the Source row: smoothed latency, failure
+    streak, last success and extracted length. Failing sources back off
+    exponentially and are deactivated after `failure_limit` consecutive
+    failures, so they stop costing every run a timeout.
+    """
+
+    def due(self, source, now: Optional[datetime] = None) -> bool:
+        retry_after = _utc(source.health_retry_after)
+        return retry_after is None or (now or datetime.now(timezone.utc)) >= retry_after
+
+    def record_success(self, source, latency: float, content_length: Optional[int]):
+        now = datetime.now(timezone.utc)
+        previous = source.health_latency
+        source.health_latency = latency if previous is None else (1 - LATENCY_ALPHA) * previous + LATENCY_ALPHA * latency
+        if content_length is not None:
+            source.health_content_length = content_length
+        source.health_failures = 0
+        source.health_last_success = now
+        source.health_last_error = None
+        source.health_retry_after = None
+        source.health_checked_at = now
+
+    def record_failure(self, source, error: str, failure_limit: int) -> Optional[str]:
+        """Returns a note when the source is backed off or deactivated."""
+        now = datetime.now(timezone.utc)
+        source.health_failures = (source.health_failures or 0) + 1
+        source.health_last_error = (error or "Unknown error")[:500]
+        source.health_checked_at = now
+        failures = source.health_failures
+        if failure_limit and failures >= failure_limit:
+            source.is_active = False
+            source.health_retry_after = None
+            return f"deactivated after {failures} consecutive failures"
+        if failures >= BACKOFF_AFTER:
+            delay = min(MAX_BACKOFF, BACKOFF_BASE * 2 ** (failures - BACKOFF_AFTER))
+            source.health_retry_after = now + delay
+            return f"backing off for {delay.total_seconds() / 3600:g}h after {failures} consecutive failures"
+        return None
+
+    async def probe(self, url: str, source_type: str = "primary", timeout: float = PROBE_TIMEOUT) -> dict:
+        """
+        Fetches a source once without a browser. Returns {"ok", "latency",
+        "content_length", "title", "error", "source_type"}; for feeds and
+        sitemaps `source_type` is whichever the document turned out to be.
+        """
+        from app.services.crawler import crawler_service
+        from app.services.feeds import feed_service, parse_document
+        started = time.monotonic()
+        result = {"ok": False, "latency": None, "content_length": 0, "title": None, "error": None, "source_type": source_type}
+        try:
+            if source_type in ("feed", "sitemap"):
+                response = await asyncio.wait_for(feed_service.fetch(url, timeout=timeout), timeout)
+                document = parse_document(response["body"], url)
+                result["content_length"] = len(document["items"])
+                result["source_type"] = "feed" if document["kind"] == "feed" else "sitemap"
+                result["ok"] = bool(document["items"])
+                if not result["ok"]:
+                    result["error"] = "No items"
+            else:
+                data = await asyncio.wait_for(crawler_service.fetch(url, timeout=timeout), timeout * 2)
+                result["title"] = data.get("title")
+                result["content_length"] = len(data.get("content") or "")
+                result["error"] = data.get("error")
+                # Pages that render with script still count: the run uses a browser
+                result["ok"] = not data.get("error")
+        except asyncio.TimeoutError:
+            result["error"] = f"Timed out after {timeout:.0f}s"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["latency"] = round(time.monotonic() - started, 3)
+        return result
+
+    async def probe_all(self, entries: List[dict], timeout: float = PROBE_TIMEOUT,
+                        concurrency: int = PROBE_CONCURRENCY) -> List[dict]:
+        """Probes `entries` ({"url", "source_type"}) concurrently, results in input order."""
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(entry: dict) -> dict:
+            async with slots:
+                return await self.probe(entry["url"], entry.get("source_type") or "primary", timeout)
+
+        return await asyncio.gather(*(one(e) for e in entries))
+
+source_health = SourceHealth()
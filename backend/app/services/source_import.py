@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import xml.etree.ElementTree as ET
+from typing import List, Optional
+from urllib.parse import urlparse
+from app.services.feeds import SOURCE_TYPES
+
+IMPORT_FORMATS = ("opml", "csv", "json")
+MAX_IMPORT_ENTRIES = 1000
+
+def detect_format(body: bytes, filename: Optional[str] = None) -> str:
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in IMPORT_FORMATS:
+        return extension
+    if extension == "xml":
+        return "opml"
+    head = body.lstrip()[:1]
+    if head in (b"[", b"{"):
+        return "json"
+    if head == b"<":
+        return "opml"
+    return "csv"
+
+def _entry(url, name=None, source_type=None) -> dict:
+    entry = {"url": "", "name": None, "source_type": None, "error": None}
+    for key, value in (("url", url), ("name", name), ("source_type", source_type)):
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            # JSON can carry numbers, lists or objects here
+            entry["error"] = f"{key} must be a string"
+            value = json.dumps(value) if key == "url" else ""
+        entry[key] = value.strip() or None
+    entry["url"] = entry["url"] or ""
+    if entry["source_type"]:
+        entry["source_type"] = entry["source_type"].lower()
+    return entry
+
+def _parse_opml(body: bytes) -> List[dict]:
+    root = ET.fromstring(body)
+    entries = []
+    for outline in root.iter("outline"):
+        feed_url = outline.get("xmlUrl")
+        page_url = outline.get("htmlUrl") or outline.get("url")
+        if not feed_url and not page_url:
+            continue # A folder
+        name = outline.get("title") or outline.get("text")
+        # OPML subscription lists are feeds; plain outlines with a url are pages
+        entries.append(_entry(feed_url, name, "feed") if feed_url else _entry(page_url, name))
+    return entries
+
+def _parse_csv(body: bytes) -> List[dict]:
+    text = body.decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    header = [h.strip().lower() for h in rows[0]]
+    if "url" in header:
+        index = {h: i for i, h in enumerate(header)}
+        def cell(row, key):
+            i = index.get(key)
+            return row[i] if i is not None and i < len(row) else None
+        return [_entry(cell(r, "url"), cell(r, "name"), cell(r, "source_type") or cell(r, "type")) for r in rows[1:] if r]
+    # No header: url[,name[,source_type]]
+    return [_entry(*r[:3]) for r in rows if r]
+
+def _parse_json(body: bytes) -> List[dict]:
+    data = json.loads(body)
+    if isinstance(data, dict):
+        data = data.get("sources", [])
+    if not isinstance(data, list):
+        raise ValueError("expected a list of sources")
+    entries = []
+    for item in data:
+        if isinstance(item, dict):
+            entry = _entry(item.get("url"), item.get("name"), item.get("source_type") or item.get("type"))
+            if not entry["url"]:
+                entry.update(url=json.dumps(item)[:200], error=entry["error"] or "Missing url")
+        else:
+            entry = _entry(item)
+        entries.append(entry)
+    return entries
+
+def parse_import(body: bytes, filename: Optional[str] = None, format: Optional[str] = None) -> List[dict]:
+    """
+    Reads a source list from OPML, CSV (`url,name,source_type`, header
+    optional) or JSON (urls, or objects with those keys). Returns
+    [{"url", "name", "source_type", "error"}], one per distinct url; entries
+    that can't be imported carry an error.
+    """
+    format = format or detect_format(body, filename)
+    if format not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+    try:
+        entries = {"opml": _parse_opml, "csv": _parse_csv, "json": _parse_json}[format](body)
+    except Exception as e:
+        # Any parser failure is a bad upload, not a server error
+        raise ValueError(f"Invalid {format.upper()}: {e}")
+    if len(entries) > MAX_IMPORT_ENTRIES:
+        raise ValueError(f"At most {MAX_IMPORT_ENTRIES} sources per import")
+
+    unique = {}
+    for entry in entries:
+        url = entry["url"]
+        if not url or url in unique:
+            continue
+        if entry["error"] is None:
+            if urlparse(url).scheme not in ("http", "https") or not urlparse(url).netloc:
+                entry["error"] = "Not an http(s) URL"
+            elif entry["source_type"] and entry["source_type"] not in SOURCE_TYPES:
+                entry["error"] = f"source_type must be one of {', '.join(SOURCE_TYPES)}"
+        unique[url] = entry
+    return list(unique.values())
@@ -0,0 +1,349 @@
+"""
+End-to-end benchmark for the report pipeline.
+
+Serves a synthetic corpus (articles with links, duplicates, slow and failing
+pages) from a local HTTP server and runs `generate_daily_report` against it
+with a deterministic fake LLM and a fake search backend, so numbers are
+reproducible and independent of the network.
+
+Run from the backend directory:
+
+    python -m benchmarks.pipeline_bench --sources 2,5 --breadth 2,4 --depth 1,2
+    python -m benchmarks.pipeline_bench --crawler browser --json bench.json
+
+Every scenario runs in a fresh process so peak RSS is per scenario.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "market rates inflation earnings guidance yield curve central bank equities bonds "
+    "commodities oil gold crypto volatility liquidity credit spreads tariffs supply chain "
+    "labour data consumer demand outlook revision forecast policy growth recession rally"
+).split()
+
+class Corpus:
+    """Deterministic set of pages addressed by path."""
+
+    def __init__(self, articles: int = 200, seed: int = 7, slow_ratio: float = 0.05,
+                 fail_ratio: float = 0.05, dup_ratio: float = 0.1, slow_delay: float = 0.5):
+        self.articles = articles
+        self.seed = seed
+        self.slow_ratio = slow_ratio
+        self.fail_ratio = fail_ratio
+        self.dup_ratio = dup_ratio
+        self.slow_delay = slow_delay
+
+    def _rng(self, key: str) -> random.Random:
+        return random.Random(f"{self.seed}:{key}")
+
+    def _article_path(self, n: int) -> str:
+        rng = self._rng(f"kind:{n}")
+        roll = rng.random()
+        if roll < self.fail_ratio:
+            return f"/fail/{n}"
+        if roll < self.fail_ratio + self.slow_ratio:
+            return f"/slow/{n}"
+        if roll < self.fail_ratio + self.slow_ratio + self.dup_ratio:
+            return f"/dup/{n}"
+        return f"/article/{n}"
+
+    def _body(self, key: str, paragraphs: int) -> str:
+        rng = self._rng(f"body:{key}")
+        return "\n".join(
+            "<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 90))) + ".</p>"
+            for _ in range(paragraphs)
+        )
+
+    def _links(self, key: str, count: int) -> str:
+        rng = self._rng(f"links:{key}")
+        targets = [self._article_path(rng.randrange(self.articles)) for _ in range(count)]
+        nav = "".join(f'<a href="/nav/{i}">Section {i}</a>' for i in range(20))
+        body = "".join(f'<li><a href="{t}">Story {t}</a></li>' for t in targets)
+        return f"<nav>{nav}</nav><ul>{body}</ul>"
+
+    def _page(self, title: str, key: str, paragraphs: int, links: int) -> str:
+        return (
+            f"<html><head><title>{title}</title></head><body>{self._links(key, links)}"
+            f"<article><h1>{title}</h1>{self._body(key, paragraphs)}</article>"
+            f"<footer>{self._links(key + ':footer', 10)}</footer></body></html>"
+        )
+
+    def _feed(self, n: int, items: int = 20) -> str:
+        rng = self._rng(f"feed:{n}")
+        entries = "".join(
+            f"<item><title>Story {i}</title><link>{self._article_path(rng.randrange(self.articles))}</link>"
+            f"<pubDate>Mon, 06 Jan 2025 {23 - i % 24:02d}:00:00 GMT</pubDate><description>Summary {i}</description></item>"
+            for i in range(items)
+        )
+        return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {n}</title>{entries}</channel></rss>'
+
+    def render(self, path: str):
+        """Returns (status, delay, html) for a request path."""
+        parts = path.strip("/").split("/")
+        if len(parts) != 2 or not parts[1].isdigit():
+            return 404, 0.0, "<html><body>Not found</body></html>"
+        kind, n = parts[0], int(parts[1])
+        if kind == "source":
+            return 200, 0.0, self._page(f"Front Page {n}", f"source:{n}", 3, 60)
+        if kind == "fail":
+            return 500, 0.0, "<html><body>Internal error</body></html>"
+        if kind in ("article", "slow", "dup"):
+            # Duplicates serve the same document as the canonical article
+            delay = self.slow_delay if kind == "slow" else 0.0
+            return 200, delay, self._page(f"Story {n}", f"article:{n}", 12, 25)
+        if kind == "feed":
+            return 200, 0.0, self._feed(n)
+        if kind == "nav":
+            return 200, 0.0, self._page(f"Section {n}", f"nav:{n}", 2, 40)
+        return 404, 0.0, "<html><body>Not found</body></html>"
+
+class CorpusServer:
+    def __init__(self, corpus: Corpus):
+        corpus_ref = corpus
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, delay, html = corpus_ref.render(self.path)
+                if delay:
+                    time.sleep(delay)
+                body = html.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass # Client gave up on a slow page (timeout or deadline)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class HttpCrawler:
+    """Browserless stand-in for CrawlerService: plain GET, same extraction."""
+
+    async def crawl(self, url: str, timeout=None):
+        import aiohttp
+        from bs4 import BeautifulSoup
+        from readability import Document
+        from app.services.links import extract_links
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout or 60)) as session:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    content = await response.text()
+            doc = Document(content)
+            summary_html = doc.summary()
+            text_content = BeautifulSoup(summary_html, "lxml").get_text(separator="\n", strip=True)
+            return {
+                "url": url,
+                "title": doc.title(),
+                "content": text_content,
+                "html": summary_html,
+                "links": extract_links(content, url, summary_html)
+            }
+        except Exception as e:
+            return {"url": url, "error": str(e), "title": "Error", "content": ""}
+
+    fetch = crawl
+
+class FakeSearchService:
+    def __init__(self, base_url: str, corpus: Corpus, latency: float = 0.05):
+        self.base_url = base_url
+        self.corpus = corpus
+        self.latency = latency
+
+    async def search(self, term: str, max_results: int = 1):
+        await asyncio.sleep(self.latency)
+        digest = int(hashlib.sha1(term.encode()).hexdigest(), 16)
+        return [
+            f"{self.base_url}{self.corpus._article_path((digest + i) % self.corpus.articles)}"
+            for i in range(max_results)
+        ]
+
+def make_fake_llm(latency: float, tokens_per_sec: float):
+    from app.services.llm import LLMProvider
+
+    class FakeLLMProvider(LLMProvider):
+        """Deterministic provider: picks leads from the prompt, emits a canned briefing."""
+
+        def __init__(self):
+            self.calls = 0
+            self.cycles = 0
+
+        @property
+        def name(self) -> str:
+            return "Fake benchmark model"
+
+        async def generate(self, prompt: str, system=None, cache_key=None) -> str:
+            self.calls += 1
+            # Latency scales with prompt size, roughly like prompt evaluation does;
+            # a system prompt is treated as an already cached prefix
+            await asyncio.sleep(latency + (len(prompt) / 4) / tokens_per_sec)
+            if '"search_terms"' in prompt + (system or ""):
+                breadth_match = re.search(r"Up to (\d+)", prompt)
+                breadth = int(breadth_match.group(1)) if breadth_match else 3
+                self.cycles += 1
+                # Leads come only from the offered links, never from pages already gathered
+                crawled = set(re.findall(r"^Source: (\S+) - ", prompt, re.M))
+                offered = re.search(r"^Available Links:\n(.*)$", prompt, re.M)
+                urls = [l["url"] for l in json.loads(offered.group(1))] if offered else []
+                urls = [u for u in urls if u not in crawled]
+                urls.sort(key=lambda u: hashlib.sha1(u.encode()).hexdigest())
+                # Terms differ per cycle so each search turns up new pages
+                terms = [f"{WORDS[(self.cycles * breadth + i) % len(WORDS)]} outlook {self.cycles}" for i in range(breadth)]
+                return json.dumps({"links": urls[:breadth], "search_terms": terms})
+            return (
+                "## Executive Summary\n\n| INDEX / THEME | Sentiment | Strength |\n|---|---|---|\n"
+                "| Equities | Bullish | Moderate |\n\n---\n## Key Developments\n\n### Benchmark\n"
+                f"- Prompt size: **{len(prompt)}** characters\n"
+            )
+
+    return FakeLLMProvider()
+
+def run_scenario(scenario: dict) -> dict:
+    workdir = tempfile.mkdtemp(prefix="luxprima-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app.core.database import SessionLocal
+    from app.core.migrations import run_migrations
+    from app.models import Setting, Source
+    from app.services.intelligence import IntelligenceService
+
+    corpus = Corpus(
+        articles=scenario["articles"],
+        seed=scenario["seed"],
+        slow_ratio=scenario["slow_ratio"],
+        fail_ratio=scenario["fail_ratio"],
+        slow_delay=scenario["slow_delay"],
+    )
+    # The real schema, FTS triggers included, so page indexing is part of the measurement
+    run_migrations()
+
+    with CorpusServer(corpus) as server:
+        db = SessionLocal()
+        try:
+            for i in range(scenario["sources"]):
+                # The first `feeds` sources are RSS feeds instead of front pages
+                if i < scenario["feeds"]:
+                    db.add(Source(url=f"{server.base_url}/feed/{i}", name=f"Bench feed {i}", source_type="feed"))
+                else:
+                    db.add(Source(url=f"{server.base_url}/source/{i}", name=f"Bench {i}"))
+            db.add(Setting(key="research_breadth", value=str(scenario["breadth"])))
+            db.add(Setting(key="research_depth", value=str(scenario["depth"])))
+            if scenario["deadline"] is not None:
+                db.add(Setting(key="run_deadline_seconds", value=str(scenario["deadline"])))
+                db.add(Setting(key="synthesis_reserve_seconds", value=str(scenario["synthesis_reserve"])))
+            db.commit()
+
+            service = IntelligenceService()
+            if scenario["crawler"] == "http":
+                service.crawler = HttpCrawler()
+            service.search = FakeSearchService(server.base_url, corpus, scenario["search_latency"])
+            llm = make_fake_llm(scenario["llm_latency"], scenario["llm_tokens_per_sec"])
+
+            started = time.perf_counter()
+            asyncio.run(service.generate_daily_report(db, llm=llm))
+            wall_time = time.perf_counter() - started
+        finally:
+            db.close()
+
+    stats = service.last_run_stats
+    pages = stats.get("pages_crawled", 0) + stats.get("pages_failed", 0)
+    return {
+        **{k: scenario[k] for k in ("sources", "breadth", "depth", "crawler")},
+        "wall_time": round(wall_time, 3),
+        "stages": {k: round(v, 3) for k, v in stats.get("stages", {}).items()},
+        "pages": pages,
+        "pages_failed": stats.get("pages_failed", 0),
+        "pages_per_sec": round(pages / wall_time, 2) if wall_time else 0.0,
+        "llm_calls": llm.calls,
+        "degraded": stats.get("degraded", []),
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LuxPrima pipeline benchmark")
+    parser.add_argument("--sources", type=_int_list, default=[3])
+    parser.add_argument("--breadth", type=_int_list, default=[3])
+    parser.add_argument("--depth", type=_int_list, default=[1])
+    parser.add_argument("--crawler", choices=["http", "browser"], default="http",
+                        help="http: aiohttp stand-in, browser: the real Playwright crawler")
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    parser.add_argument("--fail-ratio", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=5000.0)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--feeds", type=int, default=0, help="How many of the sources are RSS feeds")
+    parser.add_argument("--deadline", type=int, help="Run deadline in seconds (default: the app setting)")
+    parser.add_argument("--synthesis-reserve", type=int, default=2)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = [
+        {
+            "sources": sources, "breadth": breadth, "depth": depth,
+            "crawler": args.crawler, "articles": args.articles, "seed": args.seed,
+            "slow_ratio": args.slow_ratio, "slow_delay": args.slow_delay,
+            "fail_ratio": args.fail_ratio, "llm_latency": args.llm_latency,
+            "llm_tokens_per_sec": args.llm_tokens_per_sec, "search_latency": args.search_latency,
+            "feeds": args.feeds, "deadline": args.deadline, "synthesis_reserve": args.synthesis_reserve,
+        }
+        for sources, breadth, depth in itertools.product(args.sources, args.breadth, args.depth)
+    ]
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for scenario in scenarios:
+        with ctx.Pool(1) as pool:
+            result = pool.apply(run_scenario, (scenario,))
+        results.append(result)
+        stages = " ".join(f"{k}={v:.2f}s" for k, v in result["stages"].items())
+        print(
+            f"sources={result['sources']:<3} breadth={result['breadth']:<3} depth={result['depth']:<2} "
+            f"wall={result['wall_time']:.2f}s pages={result['pages']} ({result['pages_failed']} failed) "
+            f"pages/s={result['pages_per_sec']:.2f} rss={result['peak_rss_mb']}MB | {stages}"
+        )
+        for note in result["degraded"]:
+            print(f"    degraded: {note}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -17,9 +17,19 @@ export interface Source {
     url: string;
     name: string | null;
     is_active: boolean;
+    source_type: SourceType;
     created_at: string;
+    health_latency?: number | null;
+    health_content_length?: number | null;
+    health_failures?: number | null;
+    health_last_success?: string | null;
+    health_last_error?: string | null;
+    health_retry_after?: string | null;
 }
 
+// primary: page rendered in a browser; feed: RSS/Atom; sitemap: XML sitemap
+export type SourceType = 'primary' | 'feed' | 'sitemap';
+
 export interface Report {
     id: number;
     title: string;
@@ -27,6 +37,19 @@ export interface Report {
     content_markdown?: string;
     content_json?: any;
     logs?: string[];
+    profile_id?: number | null;
+    profiling_capture_id?: number | null;
+}
+
+export interface ResearchProfile {
+    id?: number;
+    name: string;
+    source_ids?: number[] | null;
+    synthesis_prompt?: string | null;
+    themes?: string | null;
+    research_breadth?: number | null;
+    research_depth?: number | null;
+    is_active: boolean;
 }
 
 export const api = {
@@ -35,16 +58,31 @@ export const api = {
         return res.json();
     },
 
-    createSource: async (url: string, name: string) => {
+    createSource: async (url: string, name: string, sourceType: SourceType = 'primary') => {
         const res = await fetch(`${API_URL}/sources/`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ url, name, is_active: true, source_type: 'primary' })
+            body: JSON.stringify({ url, name, is_active: true, source_type: sourceType })
         });
         if (!res.ok) throw new Error('Failed to create source');
         return res.json();
     },
 
+    // OPML, CSV or JSON; new sources are probed and unreachable ones added inactive
+    importSources: async (file: File, probe = true) => {
+        const form = new FormData();
+        form.append('file', file);
+        const res = await fetch(`${API_URL}/sources/import?probe=${probe}`, { method: 'POST', body: form });
+        if (!res.ok) throw new Error((await res.json()).detail || 'Import failed');
+        return res.json();
+    },
+
+    probeSource: async (id: number) => {
+        const res = await fetch(`${API_URL}/sources/${id}/probe`, { method: 'POST' });
+        if (!res.ok) throw new Error('Failed to check source');
+        return res.json();
+    },
+
     deleteSource: async (id: number) => {
         const res = await fetch(`${API_URL}/sources/${id}`, { method: 'DELETE' });
         if (!res.ok) throw new Error('Failed to delete source');
@@ -56,13 +94,34 @@ export const api = {
         return res.json();
     },
 
+    searchReports: async (q: string, dateFrom?: string, dateTo?: string, includePages = false) => {
+        const params = new URLSearchParams({ q, include_pages: String(includePages) });
+        if (dateFrom) params.set('date_from', dateFrom);
+        if (dateTo) params.set('date_to', dateTo);
+        const res = await fetch(`${API_URL}/reports/search?${params}`);
+        if (!res.ok) throw new Error('Search failed');
+        return res.json();
+    },
+
     getReport: async (id: number): Promise<Report> => {
         const res = await fetch(`${API_URL}/reports/${id}`);
         return res.json();
     },
 
-    generateReport: async () => {
-        const res = await fetch(`${API_URL}/reports/generate`, { method: 'POST' });
+    // Sanitised, server-rendered body; the same markup as the PDF and emails
+    getReportHtml: async (id: number): Promise<string> => {
+        const res = await fetch(`${API_URL}/reports/${id}/html`);
+        if (!res.ok) throw new Error('Failed to render report');
+        return res.text();
+    },
+
+    // With profile ids, one crawl feeds a briefing per profile
+    generateReport: async (profileIds: number[] = [], profiling?: boolean) => {
+        const params = new URLSearchParams();
+        profileIds.forEach(id => params.append('profile_ids', String(id)));
+        if (profiling !== undefined) params.set('profiling', String(profiling));
+        const query = params.toString() ? `?${params}` : '';
+        const res = await fetch(`${API_URL}/reports/generate${query}`, { method: 'POST' });
         return res.json();
     },
 
@@ -139,6 +198,18 @@ export const api = {
 
     getReportPdfUrl: (reportId: number) => `${API_URL}/reports/${reportId}/pdf`,
 
+    getProfilingCaptureUrl: (captureId: number, stacks = false) => `${API_URL}/reports/captures/${captureId}${stacks ? '/stacks' : ''}`,
+
+    getReportsExportUrl: (options: { format: 'ndjson' | 'zip', include?: ('md' | 'html' | 'pdf')[], dateFrom?: string, dateTo?: string, afterId?: number, profileId?: number }) => {
+        const params = new URLSearchParams({ format: options.format });
+        (options.include ?? []).forEach(part => params.append('include', part));
+        if (options.dateFrom) params.set('date_from', options.dateFrom);
+        if (options.dateTo) params.set('date_to', options.dateTo);
+        if (options.afterId) params.set('after_id', String(options.afterId));
+        if (options.profileId != null) params.set('profile_id', String(options.profileId));
+        return `${API_URL}/reports/export?${params}`;
+    },
+
     shareReport: async (reportId: number, email: string) => {
         const res = await fetch(`${API_URL}/reports/${reportId}/share`, {
             method: 'POST',
@@ -146,5 +217,50 @@ export const api = {
             body: JSON.stringify({ email })
         });
         return res.json();
+    },
+
+    distributeReport: async (reportId: number, emails: string[], listId?: number, attachPdf = false) => {
+        const res = await fetch(`${API_URL}/reports/${reportId}/distribute`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ emails, list_id: listId ?? null, attach_pdf: attachPdf })
+        });
+        return res.json();
+    },
+
+    getDistributionLists: async () => (await fetch(`${API_URL}/distribution-lists/`)).json(),
+
+    createDistributionList: async (name: string, emails: string[], attachPdf = false, autoSend = true) => {
+        const res = await fetch(`${API_URL}/distribution-lists/`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ name, emails, attach_pdf: attachPdf, auto_send: autoSend, is_active: true })
+        });
+        if (!res.ok) throw new Error('Failed to create distribution list');
+        return res.json();
+    },
+
+    deleteDistributionList: async (id: number) => {
+        const res = await fetch(`${API_URL}/distribution-lists/${id}`, { method: 'DELETE' });
+        if (!res.ok) throw new Error('Failed to delete distribution list');
+        return res.json();
+    },
+
+    getProfiles: async (): Promise<ResearchProfile[]> => (await fetch(`${API_URL}/profiles/`)).json(),
+
+    saveProfile: async (profile: ResearchProfile) => {
+        const res = await fetch(`${API_URL}/profiles/${profile.id ?? ''}`, {
+            method: profile.id ? 'PUT' : 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(profile)
+        });
+        if (!res.ok) throw new Error('Failed to save profile');
+        return res.json();
+    },
+
+    deleteProfile: async (id: number) => {
+        const res = await fetch(`${API_URL}/profiles/${id}`, { method: 'DELETE' });
+        if (!res.ok) throw new Error('Failed to delete profile');
+        return res.json();
     }
 };
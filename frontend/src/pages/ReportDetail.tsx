@@ -22,6 +22,8 @@ export const ReportDetail = () => {
     const { id } = useParams<{ id: string }>();
     const [report, setReport] = useState<Report | null>(null);
     const [loading, setLoading] = useState(true);
+    // Server-rendered body; markdown is rendered here only when it is unavailable
+    const [reportHtml, setReportHtml] = useState<string | null>(null);
     const [logsOpen, setLogsOpen] = useState(false);
     const [sourcesOpen, setSourcesOpen] = useState(false);
 
@@ -85,6 +87,7 @@ export const ReportDetail = () => {
     useEffect(() => {
         if (id) {
             api.getReport(parseInt(id)).then(setReport).finally(() => setLoading(false));
+            api.getReportHtml(parseInt(id)).then(setReportHtml).catch(() => setReportHtml(null));
         }
     }, [id]);
 
@@ -208,7 +211,9 @@ export const ReportDetail = () => {
                     </header>
 
                     <article className="prose prose-invert lg:prose-xl max-w-none">
-                        <ReactMarkdown remarkPlugins={[remarkGfm]}>{report.content_markdown || ''}</ReactMarkdown>
+                        {reportHtml !== null
+                            ? <div dangerouslySetInnerHTML={{ __html: reportHtml }} />
+                            : <ReactMarkdown remarkPlugins={[remarkGfm]}>{report.content_markdown || ''}</ReactMarkdown>}
                     </article>
                 </main>
 
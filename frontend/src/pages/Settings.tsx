@@ -318,7 +318,7 @@ export const Settings = () => {
 };
 
 const ScheduleManager = () => {
-    const [schedules, setSchedules] = useState<{ id: number, time: string }[]>([]);
+    const [schedules, setSchedules] = useState<{ id: number, time: string | null, cron?: string | null, interval_minutes?: number | null }[]>([]);
     const [newTime, setNewTime] = useState("");
 
     const load = async () => {
@@ -367,7 +367,9 @@ const ScheduleManager = () => {
                         key={s.id}
                         className="flex items-center justify-between bg-background/30 p-6 rounded-2xl border border-white/5 group"
                     >
-                        <span className="font-mono text-2xl font-black text-primary">{s.time}</span>
+                        <span className="font-mono text-2xl font-black text-primary">
+                            {s.cron ? s.cron : s.interval_minutes ? `every ${s.interval_minutes} min` : s.time}
+                        </span>
                         <button
                             onClick={() => remove(s.id)}
                             className="text-red-500/50 hover:text-red-500 text-xs font-bold uppercase tracking-widest opacity-0 group-hover:opacity-100 transition-all"
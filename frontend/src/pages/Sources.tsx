@@ -1,11 +1,12 @@
 import React, { useEffect, useState } from 'react';
-import { api, Source } from '../lib/api';
-import { Trash2, Plus, Globe } from 'lucide-react';
+import { api, Source, SourceType } from '../lib/api';
+import { Trash2, Plus, Globe, Rss, Map as MapIcon } from 'lucide-react';
 
 export const Sources = () => {
     const [sources, setSources] = useState<Source[]>([]);
     const [newUrl, setNewUrl] = useState('');
     const [newName, setNewName] = useState('');
+    const [newType, setNewType] = useState<SourceType>('primary');
     const [loading, setLoading] = useState(true);
 
     const loadSources = async () => {
@@ -26,9 +27,10 @@ export const Sources = () => {
     const handleAdd = async (e: React.FormEvent) => {
         e.preventDefault();
         try {
-            await api.createSource(newUrl, newName);
+            await api.createSource(newUrl, newName, newType);
             setNewUrl('');
             setNewName('');
+            setNewType('primary');
             loadSources();
         } catch (e) {
             console.error(e);
@@ -69,6 +71,15 @@ export const Sources = () => {
                         onChange={e => setNewUrl(e.target.value)}
                         required
                     />
+                    <select
+                        className="bg-background border border-white/10 rounded-lg px-4 py-2 focus:outline-none focus:border-primary"
+                        value={newType}
+                        onChange={e => setNewType(e.target.value as SourceType)}
+                    >
+                        <option value="primary">Web Page</option>
+                        <option value="feed">RSS / Atom Feed</option>
+                        <option value="sitemap">Sitemap</option>
+                    </select>
                     <button type="submit" className="bg-primary hover:bg-primary/90 text-white px-6 py-2 rounded-lg font-medium transition-colors">
                         Add Source
                     </button>
@@ -81,7 +92,7 @@ export const Sources = () => {
                     <div key={source.id} className="bg-surface p-5 rounded-xl border border-white/10 hover:border-white/20 transition-all group">
                         <div className="flex justify-between items-start mb-3">
                             <div className="bg-primary/10 p-2 rounded-lg text-primary">
-                                <Globe size={20} />
+                                {source.source_type === 'feed' ? <Rss size={20} /> : source.source_type === 'sitemap' ? <MapIcon size={20} /> : <Globe size={20} />}
                             </div>
                             <button
                                 onClick={() => handleDelete(source.id)}